@@ -1,18 +1,24 @@
 import os
 import threading
-import tempfile
-import math
 import queue
 import logging
-from typing import Any, Callable, Literal, TypeAlias, cast
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, CancelledError, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator, Literal, TypeAlias, cast
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
-from datetime import timedelta
 
+from .cache import JsonDiskCache
 from .config import (
     AUDIO_INITIAL_DIR,
+    CACHE_ENABLED,
     FASTER_WHISPER_MODEL,
     GROQ_API_KEY,
+    GROQ_CONCURRENCY,
+    LLM_CONCURRENCY,
+    LLM_MAX_TOKENS_ABSTRACT,
+    LLM_MAX_TOKENS_KEY_POINTS,
+    LLM_MAX_TOKENS_OUTLINE,
     LLM_PROVIDER,
     TARGET_FLASHCARDS,
     TARGET_GLOSSARY,
@@ -22,11 +28,13 @@ from .config import (
     WHISPER_MODEL,
 )
 from .fp_core import (
+    PostprocessStep,
     build_postprocess_plan,
     build_abstract_prompt,
     build_keypoints_prompt,
     build_outline_prompt,
     extract_json_candidate,
+    format_timestamp,
     normalize_outline_nodes,
     parse_key_points,
 )
@@ -60,11 +68,16 @@ Modelli di default:
 """
 
 QueueKind: TypeAlias = Literal[
-    "append", "progress", "status", "error", "open_results", "partial_result", "enable_llm", "done"
+    "append", "progress", "status", "error", "open_results", "partial_result", "enable_llm", "done",
+    "section_reset", "section_token",
 ]
 QueueMessage: TypeAlias = tuple[QueueKind, Any]
 ScrollbarCommand: TypeAlias = Callable[..., Any]
 LOGGER = logging.getLogger(__name__)
+CANCEL_POLL_SEC = 0.1
+
+QUEUE_POLL_BUSY_MS = 20
+QUEUE_POLL_IDLE_MS = 200
 
 GROQ_TRANSCRIPTION_MODELS = (
     "whisper-large-v3-turbo",
@@ -82,6 +95,42 @@ FASTER_WHISPER_TRANSCRIPTION_MODELS = (
 )
 
 
+def _coalesce_queue_messages(messages: list[QueueMessage]) -> list[QueueMessage]:
+    # Unisce i messaggi consecutivi dello stesso tipo: un solo insert per i
+    # testi adiacenti, solo l'ultimo valore per il progresso. I testi di ogni
+    # sequenza vengono raccolti in lista e uniti una sola volta alla fine.
+    merged: list[QueueMessage] = []
+    runs: list[list[str]] = []
+    for kind, payload in messages:
+        if merged:
+            last_kind, last_payload = merged[-1]
+            if kind == last_kind == "append":
+                runs[-1].append(payload)
+                continue
+            if kind == last_kind == "progress":
+                merged[-1] = (kind, payload)
+                continue
+            if kind == last_kind == "section_token" and last_payload[0] == payload[0]:
+                runs[-1].append(payload[1])
+                continue
+        merged.append((kind, payload))
+        runs.append(
+            [payload] if kind == "append"
+            else [payload[1]] if kind == "section_token"
+            else []
+        )
+    for i, ((kind, payload), parts) in enumerate(zip(merged, runs)):
+        if len(parts) < 2:
+            continue
+        text = "".join(parts)
+        merged[i] = (kind, text if kind == "append" else (payload[0], text))
+    return merged
+
+
+class ChunkExportError(RuntimeError):
+    pass
+
+
 class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
     """App Tkinter per caricare un file audio di una lezione, trascriverlo
     con provider selezionabile e generare riassunti, domande e flashcard
@@ -91,6 +140,8 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
     def __init__(self):
         super().__init__()
         self.ui_lang = UI_LANG if UI_LANG in TRANSLATIONS else "it"
+        self._lang_map = TRANSLATIONS[self.ui_lang]
+        self._fallback_map = TRANSLATIONS["it"]
         self.ui_lang_var = tk.StringVar(value=self.ui_lang)
         self.transcription_provider_var = tk.StringVar(
             value=self._normalize_transcription_provider(
@@ -104,11 +155,19 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
 
         # Stato
         self.audio_path = None
-        self.worker_thread = None
+        self.worker_future: Future[None] | None = None
+        self._transcription_clients = {}
+        self._notes_cache = OrderedDict()
         self.cancel_event = threading.Event()
-        self.msg_queue: queue.Queue[QueueMessage] = queue.Queue()
+        self.msg_queue: queue.SimpleQueue[QueueMessage] = queue.SimpleQueue()
+        # Un solo worker (daemon) esegue in sequenza trascrizione e post-processing;
+        # il thread Tk legge solo msg_queue.
+        self._pipeline_jobs: queue.SimpleQueue[tuple[Future[None], Callable[[], None]]] = queue.SimpleQueue()
+        threading.Thread(target=self._pipeline_loop,
+                         name="pipeline", daemon=True).start()
         self.total_ms = 0
         self.partial_outs: dict[str, Any] = {}
+        self._pending_scroll: set[tk.Text] = set()
         self.section_tab_ids = [
             ("abstract", "tab_abstract"),
             ("summary_markdown", "tab_summary"),
@@ -122,17 +181,18 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
         # UI
         self._build_ui()
         self._update_provider_env_hint()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
         self.after(100, self._process_queue)
 
     def _t(self, key: str, **kwargs: Any) -> str:
-        language_map = TRANSLATIONS.get(self.ui_lang, TRANSLATIONS["it"])
-        template = language_map.get(key, TRANSLATIONS["it"].get(key, key))
-        return template.format(**kwargs)
+        template = self._lang_map.get(key) or self._fallback_map.get(key, key)
+        return template.format_map(kwargs) if kwargs else template
 
     def _set_ui_lang(self, lang: str) -> None:
         if lang not in TRANSLATIONS:
             return
         self.ui_lang = lang
+        self._lang_map = TRANSLATIONS[lang]
         self.ui_lang_var.set(lang)
         self._refresh_ui_texts()
         self._update_provider_env_hint()
@@ -162,6 +222,7 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
             tab = self.section_frames.get(section_id)
             if tab is not None:
                 notebook.tab(tab, text=self._t(tab_title_key))
+        self._refresh_section_filenames()
 
         for widget, text_key in self.section_buttons:
             widget.config(text=self._t(text_key))
@@ -171,6 +232,12 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
         if self.status_var.get() in ready_values:
             self.status_var.set(self._t("status_ready"))
 
+    def _refresh_section_filenames(self) -> None:
+        self._section_filenames = {
+            section_id: f"{self._safe_name(self._t(tab_title_key))}.txt"
+            for section_id, tab_title_key in self.section_tab_ids
+        }
+
     def _transcription_model_values(self, provider: str) -> tuple[str, ...]:
         if self._normalize_transcription_provider(provider) == "faster-whisper":
             return FASTER_WHISPER_TRANSCRIPTION_MODELS
@@ -215,10 +282,15 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
         return bool(path and os.path.isfile(path))
 
     def _has_transcription_text(self) -> bool:
-        return bool(self.text_transc.get("1.0", tk.END).strip())
+        # Ricerca del primo carattere non vuoto: niente copia dell'intero testo
+        # a ogni tasto premuto
+        return bool(self.text_transc.search(r"\S", "1.0", tk.END, regexp=True))
+
+    def _pipeline_busy(self) -> bool:
+        return self.worker_future is not None and not self.worker_future.done()
 
     def _update_transcribe_button_state(self) -> None:
-        if self.worker_thread and self.worker_thread.is_alive():
+        if self._pipeline_busy():
             self.btn_transcribe.config(state="disabled")
             return
 
@@ -398,6 +470,7 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
         self.sections: dict[str, tk.Text] = {}
         self.section_frames: dict[str, ttk.Frame] = {}
         self.section_buttons: list[tuple[ttk.Button, str]] = []
+        self._refresh_section_filenames()
         for section_id, tab_title_key in self.section_tab_ids:
             frame = ttk.Frame(self.nb)
             self.section_frames[section_id] = frame
@@ -423,9 +496,8 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
             btn_save_txt = ttk.Button(
                 btns,
                 text=self._t("button_save_txt"),
-                command=lambda t=text, title_key=tab_title_key: self._save_string(
-                    t.get(
-                        "1.0", tk.END), f"{self._safe_name(self._t(title_key))}.txt"
+                command=lambda t=text, sid=section_id: self._save_string(
+                    t.get("1.0", tk.END), self._section_filenames[sid]
                 )
             )
             btn_save_txt.pack(side="left", padx=6)
@@ -456,19 +528,22 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
                                               (self._t("file_dialog_all"), "*.*"),
         ])
         if path:
+            if path != self.audio_path:
+                self._cached_audio = None
             self.audio_path = path
             self.audio_entry.delete(0, tk.END)
             self.audio_entry.insert(0, path)
         self._update_transcribe_button_state()
 
     def _start(self):
-        if self.worker_thread and self.worker_thread.is_alive():
+        if self._pipeline_busy():
             messagebox.showinfo(
                 self._t("dialog_title_in_progress"), self._t("dialog_msg_in_progress"))
             return
 
         api_key = GROQ_API_KEY
-        if self._transcription_provider() == "groq" and not api_key:
+        transcription_provider = self._transcription_provider()
+        if transcription_provider == "groq" and not api_key:
             messagebox.showerror(self._t("dialog_title_error"),
                                  self._t("dialog_msg_missing_api"))
             return
@@ -480,8 +555,7 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
             return
 
         try:
-            audio = self._load_audio_segment(path)
-            self.total_ms = len(audio)
+            self.total_ms = self._probe_audio_duration_ms(path)
         except Exception as e:
             messagebox.showerror(self._t("dialog_title_audio_error"), self._t(
                 "dialog_msg_cannot_open_audio", error=e))
@@ -500,17 +574,17 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
         self.btn_cancel.config(state="normal")
         self.cancel_event.clear()
 
-        # Avvia worker
-        self.worker_thread = threading.Thread(
-            target=self._worker_transcribe,
-            args=(api_key, path, self.model_var.get(),
-                  self.lang_var.get(), int(self.chunk_var.get())),
-            daemon=True,
+        # Avvia worker (i valori Tk vengono letti qui, nel thread UI)
+        model = self.model_var.get()
+        lang = self.lang_var.get()
+        chunk_sec = int(self.chunk_var.get())
+        self.worker_future = self._submit_pipeline(
+            lambda: self._worker_transcribe(
+                api_key, path, model, lang, chunk_sec, transcription_provider)
         )
-        self.worker_thread.start()
 
     def _cancel(self):
-        if self.worker_thread and self.worker_thread.is_alive():
+        if self._pipeline_busy():
             self.cancel_event.set()
             self.status_var.set(self._t("status_canceling"))
             self.text_transc.insert(tk.END, self._t(
@@ -533,81 +607,152 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
             self.status_var.set(self._t("dialog_msg_saved_file", path=path))
 
     # ------------------------- Worker: Trascrizione -------------------------
-    def _worker_transcribe(self, api_key: str, path: str, model: str, lang: str, chunk_sec: int):
-        transcription_provider = self._transcription_provider()
+    def _completed_until_cancel(self, futures: Iterable[Future[Any]]) -> Iterator[Future[Any]]:
+        # Come as_completed, ma si interrompe entro CANCEL_POLL_SEC da _cancel
+        pending = set(futures)
+        while pending and not self.cancel_event.is_set():
+            done, pending = wait(
+                pending, timeout=CANCEL_POLL_SEC, return_when=FIRST_COMPLETED)
+            yield from done
+
+    def _worker_transcribe(self, api_key: str, path: str, model: str, lang: str, chunk_sec: int,
+                           transcription_provider: str):
         try:
             client = self._create_transcription_client(
-                api_key, self.model_var.get())
+                api_key, model, transcription_provider)
         except Exception as e:
             self.msg_queue.put(("error", str(e)))
             return
 
+        transcript_cache = JsonDiskCache("transcripts")
+        cache_key: str | None = None
+        if CACHE_ENABLED:
+            try:
+                cache_key = self._transcript_cache_key(
+                    transcription_provider, path, model, lang, chunk_sec)
+                cached_previews = transcript_cache.get(cache_key)
+            except Exception:
+                LOGGER.warning("Cache trascrizioni non disponibile", exc_info=True)
+                cached_previews = None
+            if isinstance(cached_previews, list) and cached_previews:
+                self.msg_queue.put(
+                    ("append", "".join(str(p) for p in cached_previews)))
+                self.msg_queue.put(("progress", 100))
+                self.msg_queue.put(
+                    ("status", self._t("status_transcription_completed")))
+                return
+
         try:
-            audio = self._load_audio_segment(path)
-            audio = audio.set_channels(1).set_frame_rate(16000)
-            total_ms = len(audio)
+            audio = self._load_transcription_audio(path)
         except Exception as e:
             self.msg_queue.put(
                 ("error", self._t("worker_error_open_audio", error=e)))
             return
 
-        chunk_ms = max(10, chunk_sec) * 1000
-        n_chunks = math.ceil(total_ms / chunk_ms)
+        # Chunk allineati alle pause: ogni chunk resta sotto chunk_sec
+        chunk_ranges = self._plan_audio_chunks(
+            audio, max(10, chunk_sec) * 1000)
+        n_chunks = len(chunk_ranges)
+        max_workers = GROQ_CONCURRENCY if transcription_provider == "groq" else 1
 
-        for i in range(n_chunks):
+        def transcribe_job(i: int, start: int, end: int) -> str | None:
             if self.cancel_event.is_set():
-                self.msg_queue.put(
-                    ("status", self._t("status_canceled_by_user")))
-                break
-
-            start = i * chunk_ms
-            end = min((i + 1) * chunk_ms, total_ms)
-            seg = audio[start:end]
-
-            # Esporta in WAV temporaneo
+                return None
+            # Export nel job: in memoria restano solo i chunk in lavorazione,
+            # non l'intera coda di quelli inviati all'executor
             try:
-                with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                    tmp_path = tmp.name
-                    seg.export(tmp_path, format="wav")
-            except Exception as e:
-                self.msg_queue.put(
-                    ("error", self._t("worker_error_export_chunk", chunk=i+1, error=e)))
-                break
-
-            # Chiamata provider trascrizione
-            try:
-                text_piece = self._transcribe_audio_chunk(
-                    client, tmp_path, model, lang)
+                chunk_audio = self._export_audio_chunk(
+                    audio, path, start, end,
+                    stream_copy=transcription_provider == "groq",
+                )
             except Exception as e:
-                if transcription_provider == "groq":
-                    self.msg_queue.put(
-                        ("error", self._t("worker_error_groq_chunk", chunk=i+1, error=e)))
-                else:
+                raise ChunkExportError(
+                    self._t("worker_error_export_chunk", chunk=i+1, error=e)) from e
+            return self._transcribe_audio_chunk(client, chunk_audio, model, lang)
+
+        futures: dict[Future[str | None], tuple[int, int, int]] = {}
+        flushed_previews: list[str] = []
+        previews: dict[int, str] = {}
+        next_chunk = 0
+        completed = 0
+        interrupted = False
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            for i, (start, end) in enumerate(chunk_ranges):
+                if self.cancel_event.is_set():
+                    interrupted = True
+                    break
+
+                # Chunk senza parlato: nessuna chiamata al provider (ed evita
+                # le allucinazioni di Whisper sul silenzio)
+                if self._is_silent_chunk(audio, start, end):
+                    silent_future: Future[str | None] = Future()
+                    silent_future.set_result(self._t("chunk_silence"))
+                    futures[silent_future] = (i, start, end)
+                    continue
+
+                # Export (stream copy per Groq se possibile) e chiamata provider
+                # trascrizione, in parallelo fino a max_workers
+                futures[executor.submit(transcribe_job, i, start, end)] = (
+                    i, start, end)
+
+            # Annullato prima dell'invio: nessuna attesa dei chunk già inviati
+            if not interrupted:
+                for future in self._completed_until_cancel(futures):
+                    i, start, end = futures[future]
+                    try:
+                        text_piece = future.result()
+                    except ChunkExportError as e:
+                        self.msg_queue.put(("error", str(e)))
+                        interrupted = True
+                        break
+                    except Exception as e:
+                        if transcription_provider == "groq":
+                            self.msg_queue.put(
+                                ("error", self._t("worker_error_groq_chunk", chunk=i+1, error=e)))
+                        else:
+                            self.msg_queue.put(
+                                ("error", f"Errore faster-whisper chunk {i+1}: {e}"))
+                        interrupted = True
+                        break
+
+                    if text_piece is None or self.cancel_event.is_set():
+                        interrupted = True
+                        break
+
+                    # Anteprima con timestamp, emessa in ordine cronologico
+                    h1 = format_timestamp(start)
+                    h2 = format_timestamp(end)
+                    previews[i] = f"[{h1} → {h2}]\n{text_piece}\n\n"
+                    ready_parts: list[str] = []
+                    while next_chunk in previews:
+                        ready_parts.append(previews.pop(next_chunk))
+                        next_chunk += 1
+                    if ready_parts:
+                        flushed_previews.extend(ready_parts)
+                        self.msg_queue.put(("append", "".join(ready_parts)))
+
+                    completed += 1
+                    self.msg_queue.put(("progress", (completed / n_chunks) * 100))
                     self.msg_queue.put(
-                        ("error", f"Errore faster-whisper chunk {i+1}: {e}"))
-                break
-            finally:
-                try:
-                    os.unlink(tmp_path)
-                except Exception:
-                    pass
-
-            # Anteprima con timestamp
-            h1 = str(timedelta(milliseconds=start))
-            h2 = str(timedelta(milliseconds=end))
-            preview_line = f"[{h1} → {h2}]\n{text_piece}\n\n"
-            self.msg_queue.put(("append", preview_line))
-
-            progress_val = (end / total_ms) * 100
-            self.msg_queue.put(("progress", progress_val))
+                        ("status", self._t("status_chunk_completed", current=completed, total=n_chunks)))
+        finally:
+            # Su annullamento o errore non si attendono le richieste in volo:
+            # il worker torna subito libero e i risultati tardivi vengono scartati
+            executor.shutdown(
+                wait=not (interrupted or self.cancel_event.is_set()),
+                cancel_futures=True,
+            )
+
+        if self.cancel_event.is_set():
             self.msg_queue.put(
-                ("status", self._t("status_chunk_completed", current=i+1, total=n_chunks)))
-        else:
+                ("status", self._t("status_canceled_by_user")))
+        elif not interrupted:
+            if cache_key is not None:
+                transcript_cache.put(cache_key, flushed_previews)
             self.msg_queue.put(
                 ("status", self._t("status_transcription_completed")))
 
-        self.msg_queue.put(("done", None))
-
     # ------------------------- Post-processing LLM (nuova pipeline) -------------------------
     def _postprocess(self):
         full_text = self.text_transc.get("1.0", tk.END).strip()
@@ -617,93 +762,160 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
             return
 
         api_key = GROQ_API_KEY
-        if self._llm_provider() == "groq" and not api_key:
+        llm_provider = self._llm_provider()
+        if llm_provider == "groq" and not api_key:
             messagebox.showerror(self._t("dialog_title_error"),
                                  self._t("dialog_msg_missing_api"))
             return
 
         self.btn_llm.config(state="disabled")
+        self.cancel_event.clear()
         self.status_var.set(self._t("status_llm_generating"))
         self.text_transc.insert(tk.END, self._t("status_llm_note_line"))
         self.partial_outs = {}
+        # Lingua fissata sul thread Tk: tutte le sezioni usano la stessa anche
+        # se l'utente cambia lingua durante la generazione
+        current_language = self._current_language()
+        notes_label = self._llm_notes_label()
+        system_prompt = self._llm_academic_system_prompt()
 
         def worker():
             try:
-                client = self._create_llm_client(api_key)
-                notes_label = self._llm_notes_label()
-                system_prompt = self._llm_academic_system_prompt()
+                client = self._create_llm_client(api_key, llm_provider)
 
                 # 1) Map-Reduce su trascrizione → NOTE COMPLETE
                 self.msg_queue.put(("status", self._t("status_llm_notes")))
-                notes = self._map_reduce_notes(client, full_text)
+                notes = self._notes_for_transcript(
+                    client, llm_provider, full_text, current_language)
 
-                current_language = self._current_language()
                 steps = build_postprocess_plan(
                     target_questions=TARGET_QUESTIONS,
                     target_flashcards=TARGET_FLASHCARDS,
                     target_glossary=TARGET_GLOSSARY,
                 )
 
-                outs: dict[str, Any] = {}
-                for step in steps:
+                def run_step(step: PostprocessStep) -> Any:
                     self.msg_queue.put(("status", self._t(step["status_key"])))
 
                     if step["kind"] == "summary":
-                        result = self._gen_summary(client, notes)
-                    elif step["kind"] == "list":
-                        result = self._gen_list_with_count(
+                        return self._gen_summary(
+                            client, notes, current_language,
+                            stream_section=step["section"])
+                    if step["kind"] == "list":
+                        return self._gen_list_with_count(
                             client,
                             notes,
+                            current_language,
                             step["list_kind"],
                             step["target"],
+                            stream_section=step["section"],
                         )
-                    else:
-                        prompt_name = step["prompt_name"]
-                        if prompt_name == "abstract":
-                            user_prompt = build_abstract_prompt(
-                                current_language=current_language,
-                                notes_text=notes,
-                                notes_label_value=notes_label,
-                            )
-                            result = self._llm(
-                                client, system_prompt, user_prompt)
-                        elif prompt_name == "outline":
-                            user_prompt = build_outline_prompt(
-                                current_language=current_language,
-                                notes_text=notes,
-                                notes_label_value=notes_label,
-                            )
-                            outline_json_txt = self._llm(
-                                client, system_prompt, user_prompt)
-                            outline_raw = extract_json_candidate(
-                                outline_json_txt)
-                            result = normalize_outline_nodes(outline_raw)
-                        elif prompt_name == "key_points":
-                            user_prompt = build_keypoints_prompt(
-                                current_language=current_language,
-                                notes_text=notes,
-                                notes_label_value=notes_label,
-                            )
-                            keypoints_txt = self._llm(
-                                client, system_prompt, user_prompt)
-                            result = parse_key_points(keypoints_txt)
-                        else:
-                            raise RuntimeError(
-                                f"Prompt non supportato nel piano: {prompt_name}")
-
-                    outs[step["section"]] = result
-                    self.msg_queue.put(
-                        ("partial_result", {step["section"]: result}))
 
+                    prompt_name = step["prompt_name"]
+                    if prompt_name == "abstract":
+                        user_prompt = build_abstract_prompt(
+                            current_language=current_language,
+                            notes_text=notes,
+                            notes_label_value=notes_label,
+                        )
+                        return self._llm(
+                            client, system_prompt, user_prompt, step["section"],
+                            max_tokens=LLM_MAX_TOKENS_ABSTRACT)
+                    if prompt_name == "outline":
+                        user_prompt = build_outline_prompt(
+                            current_language=current_language,
+                            notes_text=notes,
+                            notes_label_value=notes_label,
+                        )
+                        # JSON in streaming come anteprima; la scheda viene poi
+                        # sostituita dall'outline formattato
+                        outline_json_txt = self._llm(
+                            client, system_prompt, user_prompt, step["section"],
+                            max_tokens=LLM_MAX_TOKENS_OUTLINE)
+                        outline_raw = extract_json_candidate(outline_json_txt)
+                        return normalize_outline_nodes(outline_raw)
+                    if prompt_name == "key_points":
+                        user_prompt = build_keypoints_prompt(
+                            current_language=current_language,
+                            notes_text=notes,
+                            notes_label_value=notes_label,
+                        )
+                        keypoints_txt = self._llm(
+                            client, system_prompt, user_prompt, step["section"],
+                            max_tokens=LLM_MAX_TOKENS_KEY_POINTS)
+                        return parse_key_points(keypoints_txt)
+                    raise RuntimeError(
+                        f"Prompt non supportato nel piano: {prompt_name}")
+
+                def run_cached_step(step: PostprocessStep) -> Any:
+                    return self._cached_section(
+                        llm_provider, current_language, notes, step,
+                        lambda: run_step(step))
+
+                # 2) Sezioni indipendenti tra loro: tutte in parallelo sulle note
+                outs: dict[str, Any] = {}
+                executor = ThreadPoolExecutor(max_workers=LLM_CONCURRENCY)
+                try:
+                    futures = {
+                        executor.submit(run_cached_step, step): step["section"]
+                        for step in steps
+                    }
+                    for completed, future in enumerate(
+                            self._completed_until_cancel(futures), 1):
+                        section = futures[future]
+                        result = future.result()
+                        outs[section] = result
+                        self.msg_queue.put(
+                            ("partial_result", {section: result}))
+                        self.msg_queue.put(
+                            ("status", self._t("status_llm_sections_completed",
+                                               current=completed, total=len(futures))))
+                finally:
+                    # Su annullamento/chiusura le sezioni in coda vengono scartate
+                    # e non si attendono le chiamate in volo
+                    executor.shutdown(
+                        wait=not self.cancel_event.is_set(), cancel_futures=True)
+
+                if self.cancel_event.is_set():
+                    raise CancelledError()
                 self.msg_queue.put(("open_results", outs))
+            except CancelledError:
+                self.msg_queue.put(
+                    ("status", self._t("status_canceled_by_user")))
             except Exception as e:
                 self.msg_queue.put(
                     ("error", self._t("worker_error_llm", error=e)))
             finally:
-                self.msg_queue.put(("status", self._t("status_ready")))
+                if not self.cancel_event.is_set():
+                    self.msg_queue.put(("status", self._t("status_ready")))
                 self.msg_queue.put(("enable_llm", None))
 
-        threading.Thread(target=worker, daemon=True).start()
+        self.worker_future = self._submit_pipeline(worker)
+
+    # ------------------------- Pipeline worker -------------------------
+    def _submit_pipeline(self, job: Callable[[], None]) -> Future[None]:
+        future: Future[None] = Future()
+        self._pipeline_jobs.put((future, job))
+        return future
+
+    def _pipeline_loop(self) -> None:
+        while True:
+            future, job = self._pipeline_jobs.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                job()
+            except Exception as e:
+                LOGGER.exception("Unhandled error in pipeline worker")
+                self.msg_queue.put(("error", str(e)))
+                future.set_exception(e)
+            else:
+                future.set_result(None)
+            self.msg_queue.put(("done", None))
+
+    def _on_close(self) -> None:
+        self.cancel_event.set()
+        self.destroy()
 
     # ------------------------- Utils -------------------------
     def _get_yview_command(self, widget: tk.Text) -> ScrollbarCommand:
@@ -725,7 +937,7 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
     def _handle_queue_partial_result(self, payload: Any) -> None:
         partial_payload = cast(dict[str, Any], payload)
         self.partial_outs.update(partial_payload)
-        self._open_results(self.partial_outs)
+        self._open_results(partial_payload)
         for section_id in partial_payload.keys():
             tab = self.section_frames.get(section_id)
             if tab is not None:
@@ -735,7 +947,7 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
     def _handle_queue_message(self, kind: QueueKind, payload: Any) -> None:
         def handle_append(p: Any) -> None:
             self.text_transc.insert(tk.END, p)
-            self.text_transc.see(tk.END)
+            self._pending_scroll.add(self.text_transc)
 
         def handle_progress(p: Any) -> None:
             self.progress.configure(value=p)
@@ -743,7 +955,7 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
         def handle_status(p: Any) -> None:
             self.status_var.set(str(p))
             self.text_transc.insert(tk.END, self._t("status_tag", message=p))
-            self.text_transc.see(tk.END)
+            self._pending_scroll.add(self.text_transc)
 
         def handle_error(p: Any) -> None:
             self.status_var.set(self._t("dialog_title_error"))
@@ -755,6 +967,21 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
         def handle_enable_llm(_p: Any) -> None:
             self.btn_llm.config(state="normal")
 
+        def handle_section_reset(p: Any) -> None:
+            widget = self.sections.get(str(p))
+            if widget is not None:
+                widget.delete("1.0", tk.END)
+            tab = self.section_frames.get(str(p))
+            if tab is not None:
+                cast(Any, self.nb).select(tab)
+
+        def handle_section_token(p: Any) -> None:
+            section_id, token = cast(tuple[str, str], p)
+            widget = self.sections.get(section_id)
+            if widget is not None:
+                widget.insert(tk.END, token)
+                self._pending_scroll.add(widget)
+
         def handle_done(_p: Any) -> None:
             self._update_transcribe_button_state()
             self.btn_cancel.config(state="disabled")
@@ -768,6 +995,8 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
             "partial_result": self._handle_queue_partial_result,
             "enable_llm": handle_enable_llm,
             "done": handle_done,
+            "section_reset": handle_section_reset,
+            "section_token": handle_section_token,
         }
 
         if kind == "status":
@@ -783,16 +1012,27 @@ class LectureTranscriberApp(UIResultsMixin, ProcessingMixin, tk.Tk):
 
     # ------------------------- Aggiornamento UI (main thread) -------------------------
     def _process_queue(self):
+        messages: list[QueueMessage] = []
         try:
-            while not self.msg_queue.empty():
-                kind, payload = self.msg_queue.get()
+            while True:
+                try:
+                    messages.append(self.msg_queue.get_nowait())
+                except queue.Empty:
+                    break
+            for kind, payload in _coalesce_queue_messages(messages):
                 self._handle_queue_message(kind, payload)
+            # Un solo scroll per widget a fine tick, non uno per messaggio
+            for widget in self._pending_scroll:
+                widget.see(tk.END)
         except Exception as e:
             LOGGER.exception("Unhandled error while processing UI queue")
             self.status_var.set(self._t("dialog_title_error"))
             messagebox.showerror(self._t("dialog_title_error"), str(e))
         finally:
-            self.after(100, self._process_queue)
+            self._pending_scroll.clear()
+            # Polling rapido mentre arrivano messaggi, lento quando la coda è ferma
+            self.after(QUEUE_POLL_BUSY_MS if messages else QUEUE_POLL_IDLE_MS,
+                       self._process_queue)
 
 
 def main() -> None:
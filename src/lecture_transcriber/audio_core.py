@@ -0,0 +1,113 @@
+import io
+import wave
+from typing import Any
+
+import numpy as np
+
+SAMPLE_DTYPES: dict[int, Any] = {
+    1: np.int8,
+    2: np.int16,
+    4: np.int32,
+}
+
+
+def pcm_samples(raw_data: bytes, *, sample_width: int, channels: int) -> np.ndarray:
+    dtype = SAMPLE_DTYPES.get(sample_width)
+    if dtype is None:
+        raise ValueError(f"Sample width non supportata: {sample_width}")
+    samples = np.frombuffer(raw_data, dtype=dtype)
+    if channels > 1:
+        mixed = samples.reshape(-1, channels).sum(axis=1, dtype=np.int64)
+        samples = (mixed // channels).astype(dtype)
+    return samples
+
+
+def window_energies(
+    samples: np.ndarray,
+    *,
+    frame_rate: int,
+    window_ms: int = 10,
+) -> tuple[np.ndarray, int]:
+    win = max(1, frame_rate * window_ms // 1000)
+    n_windows = len(samples) // win
+
+    # Energie al quadrato in interi: int16² sta in int32, niente float né sqrt
+    frames = samples[:n_windows * win].reshape(n_windows, win)
+    work_dtype = np.int32 if frames.itemsize <= 2 else np.float64
+    squares = frames.astype(work_dtype)
+    squares *= squares
+    energy = squares.sum(
+        axis=1, dtype=np.int64 if work_dtype is np.int32 else np.float64)
+    return energy, win
+
+
+def silence_ranges_from_energies(
+    energy: np.ndarray,
+    *,
+    win: int,
+    frame_rate: int,
+    min_silence_ms: int,
+    thresh_db: float,
+    full_scale: float,
+) -> list[tuple[int, int]]:
+    if len(energy) == 0:
+        return []
+    thresh = int(full_scale * 10 ** (thresh_db / 20))
+    silent = energy < thresh * thresh * win
+
+    edges = np.flatnonzero(
+        np.diff(np.concatenate(([0], silent.astype(np.int8), [0]))))
+    starts, ends = edges[0::2], edges[1::2]
+    ms_per_window = win * 1000 / frame_rate
+    keep = (ends - starts) * ms_per_window >= min_silence_ms
+    return [
+        (int(start * ms_per_window), int(end * ms_per_window))
+        for start, end in zip(starts[keep], ends[keep])
+    ]
+
+
+def quietest_cut_ms(
+    energy: np.ndarray,
+    *,
+    win: int,
+    frame_rate: int,
+    lo_ms: int,
+    hi_ms: int,
+) -> int:
+    # Taglio al centro della finestra meno energetica in [lo_ms, hi_ms]
+    ms_per_window = win * 1000 / frame_rate
+    lo_idx = int(lo_ms // ms_per_window)
+    hi_idx = min(len(energy), int(hi_ms // ms_per_window))
+    if hi_idx <= lo_idx:
+        return hi_ms
+    idx = lo_idx + int(np.argmin(energy[lo_idx:hi_idx]))
+    return min(hi_ms, max(lo_ms, int((idx + 0.5) * ms_per_window)))
+
+
+def chunk_rms(samples: np.ndarray, *, frame_rate: int, start_ms: int, end_ms: int) -> float:
+    chunk = samples[start_ms * frame_rate // 1000:end_ms * frame_rate // 1000]
+    if len(chunk) == 0:
+        return 0.0
+    return float(np.sqrt(np.square(chunk, dtype=np.float64).mean()))
+
+
+def wav_chunk_bytes(
+    raw_data: bytes,
+    *,
+    start_ms: int,
+    end_ms: int,
+    frame_rate: int,
+    channels: int,
+    sample_width: int,
+) -> bytes:
+    # Taglio diretto sul PCM grezzo: nessuna copia intermedia di AudioSegment
+    frame_width = channels * sample_width
+    start = start_ms * frame_rate // 1000 * frame_width
+    end = end_ms * frame_rate // 1000 * frame_width
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(sample_width)
+        wav.setframerate(frame_rate)
+        wav.writeframes(memoryview(raw_data)[start:end])
+    return buf.getvalue()
@@ -0,0 +1,125 @@
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+from typing import Any
+
+from . import json_codec
+from .config import CACHE_DIR
+from .provider_protocols import AudioBytes, LLMClientLike, TokenCallback, TranscriptionClientLike
+
+LOGGER = logging.getLogger(__name__)
+
+
+def default_cache_dir() -> str:
+    if CACHE_DIR:
+        return CACHE_DIR
+    base_dir = os.getenv("XDG_CACHE_HOME", "").strip() or os.path.join(
+        os.path.expanduser("~"), ".cache")
+    return os.path.join(base_dir, "lecture-transcriber")
+
+
+def file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        file_digest = getattr(hashlib, "file_digest", None)
+        if file_digest is not None:
+            return file_digest(f, "sha256").hexdigest()
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return hashlib.sha256(mm).hexdigest()
+
+
+def text_sha256(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class JsonDiskCache:
+    def __init__(self, namespace: str, root: str | None = None):
+        self._dir = os.path.join(root or default_cache_dir(), namespace)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._dir, f"{key}.json")
+
+    def get(self, key: str) -> Any | None:
+        try:
+            with open(self._path(key), "rb") as f:
+                return json_codec.loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, value: Any) -> None:
+        try:
+            os.makedirs(self._dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self._dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(json_codec.dumps(value))
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            LOGGER.warning("Impossibile scrivere la cache in %s",
+                           self._dir, exc_info=True)
+
+
+class CachedTranscriptionClient:
+    def __init__(self, client: TranscriptionClientLike, cache: JsonDiskCache, provider: str):
+        self._client = client
+        self._cache = cache
+        self._provider = provider
+
+    def transcribe(
+        self,
+        audio: str | AudioBytes | None = None,
+        *,
+        wav_path: str | None = None,
+        model: str | None = None,
+        lang: str = "auto",
+        language: str | None = None,
+    ) -> str:
+        audio_input = audio or wav_path
+        if not audio_input:
+            raise ValueError("audio (or wav_path) is required")
+
+        audio_digest = (
+            file_sha256(audio_input) if isinstance(audio_input, str)
+            else hashlib.blake2b(audio_input[1], digest_size=16).hexdigest()
+        )
+        key = text_sha256(self._provider, model or "", language or lang,
+                          audio_digest)
+        cached = self._cache.get(key)
+        if isinstance(cached, str):
+            return cached
+
+        text = self._client.transcribe(
+            audio_input, model=model, lang=lang, language=language)
+        self._cache.put(key, text)
+        return text
+
+
+class CachedLLMClient:
+    def __init__(self, client: LLMClientLike, cache: JsonDiskCache, model_id: str):
+        self._client = client
+        self._cache = cache
+        self._model_id = model_id
+
+    def complete(self, *, system: str, user: str, on_token: TokenCallback | None = None,
+                 max_tokens: int | None = None) -> str:
+        key_parts = (self._model_id, system, user)
+        if max_tokens is not None:
+            key_parts += (str(max_tokens),)
+        key = text_sha256(*key_parts)
+        cached = self._cache.get(key)
+        if isinstance(cached, str):
+            if on_token is not None:
+                on_token(cached)
+            return cached
+
+        text = self._client.complete(
+            system=system, user=user, on_token=on_token, max_tokens=max_tokens)
+        if text:
+            self._cache.put(key, text)
+        return text
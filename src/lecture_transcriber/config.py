@@ -4,6 +4,8 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 HUGGINGFACE_API_KEY = os.getenv("HUGGINGFACE_API_KEY", "")
 AUDIO_INITIAL_DIR = os.getenv("AUDIO_INITIAL_DIR", "").strip()
 WHISPER_MODEL = "whisper-large-v3-turbo"
+GROQ_CONCURRENCY = max(1, int(os.getenv("GROQ_CONCURRENCY", "4")))
+GROQ_MAX_RETRIES = max(0, int(os.getenv("GROQ_MAX_RETRIES", "5")))
 LLM_MODEL = "llama-3.3-70b-versatile"
 TRANSCRIPTION_PROVIDER = os.getenv(
     "TRANSCRIPTION_PROVIDER", "groq").strip().lower()
@@ -12,6 +14,7 @@ FASTER_WHISPER_DEVICE = os.getenv("FASTER_WHISPER_DEVICE", "auto")
 FASTER_WHISPER_COMPUTE_TYPE = os.getenv(
     "FASTER_WHISPER_COMPUTE_TYPE", "int8")
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq").strip().lower()
+LLM_CONCURRENCY = max(1, int(os.getenv("LLM_CONCURRENCY", "4")))
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2:3b")
 
@@ -20,8 +23,29 @@ TARGET_SUMMARY_WORDS_MAX = 2200
 TARGET_QUESTIONS = 16
 TARGET_FLASHCARDS = 30
 TARGET_GLOSSARY = 20
+# Elementi extra chiesti al primo giro delle liste (poi troncate al target)
+LIST_EXTRA_ITEMS = 3
 LLM_TEMP = 0.2
 LLM_MAX_TOKENS = 4000
+# Limiti di output per sezione, dimensionati sul testo atteso
+LLM_MAX_TOKENS_ABSTRACT = 768
+LLM_MAX_TOKENS_OUTLINE = 2048
+LLM_MAX_TOKENS_KEY_POINTS = 1024
+LLM_MAX_TOKENS_SUMMARY = TARGET_SUMMARY_WORDS_MAX * 2
 CHUNK_CHARLEN = 6000
+# Trascrizioni compattate entro questa soglia saltano la fase map: una sola
+# chiamata sull'intero testo. Alzarla solo con modelli a contesto ampio.
+FULL_CONTEXT_CHARLEN = max(0, int(os.getenv("FULL_CONTEXT_CHARLEN", str(CHUNK_CHARLEN))))
+AUDIO_SAMPLE_RATE = 16000
+SILENCE_MIN_LEN_MS = 400
+SILENCE_THRESH_OFFSET_DB = 16
+# Senza pause utili, il taglio cade sul punto più quieto degli ultimi N ms
+CHUNK_CUT_SEARCH_MS = 10000
+# Chunk con RMS sotto soglia (≈ -46 dBFS su PCM16) non vengono inviati al provider
+SILENT_CHUNK_RMS = 150
 
 UI_LANG = os.getenv("UI_LANG", "it")
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1").strip().lower() not in {
+    "0", "false", "no", "off"}
+CACHE_DIR = os.getenv("CACHE_DIR", "").strip()
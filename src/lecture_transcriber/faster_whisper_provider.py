@@ -1,11 +1,12 @@
 import inspect
+import io
 import os
 from typing import Any
 
 from faster_whisper import WhisperModel
 
 from .config import HUGGINGFACE_API_KEY
-from .provider_protocols import TranscriptionClientLike
+from .provider_protocols import AudioBytes, TranscriptionClientLike
 
 
 class FasterWhisperTranscriptionClient:
@@ -14,7 +15,7 @@ class FasterWhisperTranscriptionClient:
 
     def transcribe(
         self,
-        audio: str | None = None,
+        audio: str | AudioBytes | None = None,
         *,
         wav_path: str | None = None,
         model: str | None = None,
@@ -24,16 +25,20 @@ class FasterWhisperTranscriptionClient:
     ) -> str:
         del model
 
-        audio_path = audio or wav_path
-        if not audio_path:
+        audio_input = audio or wav_path
+        if not audio_input:
             raise ValueError("audio (or wav_path) is required")
 
         effective_language = language
         if effective_language is None:
             effective_language = None if lang == "auto" else lang
 
+        source: str | io.BytesIO = (
+            audio_input if isinstance(audio_input, str)
+            else io.BytesIO(audio_input[1])
+        )
         segments, _ = self._model.transcribe(
-            audio_path,
+            source,
             language=effective_language,
             **kwargs,
         )
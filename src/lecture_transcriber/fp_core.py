@@ -1,6 +1,11 @@
+import bisect
+import csv
+import io
 import json
 import re
-from typing import Any, Iterable, Literal, TypedDict, cast
+from typing import Any, Callable, Iterable, Literal, TypedDict, cast
+
+from . import json_codec
 
 
 StepKind = Literal["llm_prompt", "summary", "list"]
@@ -19,6 +24,21 @@ AVAILABLE_LANGS: dict[str, PromptLanguage] = {
 
 DEFAULT_PROMPT_LANGUAGE: PromptLanguage = "it"
 
+_WS_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w+")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…]) ")
+_JSON_FENCE_RE = re.compile(
+    r"```json\s*([\{\[][^`]*?[\}\]])\s*```", re.IGNORECASE)
+_SAFE_NAME_RE = re.compile(r"[^a-zA-Z0-9_-]+")
+_WORDS_TAG_RE = re.compile(r"<!--\s*WORDS:\s*(\d+)\s*-->", re.IGNORECASE)
+_JSON_START_RE = re.compile(r"[\[{]")
+_JSON_OBJECT_GAP_RE = re.compile(r"[\s,]*\{")
+# Intestazioni dei chunk "[h:mm:ss → h:mm:ss]", segnaposto dei chunk silenziosi
+# (chunk_silence) e righe "[STATUS] …" della trascrizione
+_TRANSCRIPT_MARKER_RE = re.compile(
+    r"^(?:\[\d+:\d{2}:\d{2} → \d+:\d{2}:\d{2}\]|\[(?:silenzio|silence)\]|\[STATUS\] .*)$",
+    re.MULTILINE)
+
 
 class PostprocessStep(TypedDict):
     section: str
@@ -39,13 +59,89 @@ def normalize_choice(value: str, valid: set[str], default: str) -> str:
     return normalized if normalized in valid else default
 
 
+def dedupe_transcript(text: str) -> str:
+    # Collassa le frasi identiche consecutive (ripetizioni/allucinazioni di
+    # Whisper) prima della fase map. Senza intestazioni dei chunk e righe di
+    # stato, anche le ripetizioni a cavallo tra due chunk audio risultano adiacenti
+    compact = _WS_RE.sub(" ", _TRANSCRIPT_MARKER_RE.sub("", text)).strip()
+    kept: list[str] = []
+    previous_key = None
+    for sentence in _SENTENCE_END_RE.split(compact):
+        key = sentence.strip().casefold()
+        if not key or key == previous_key:
+            continue
+        kept.append(sentence)
+        previous_key = key
+    return " ".join(kept)
+
+
 def split_text_chunks(text: str, chunk_chars: int) -> list[str]:
-    compact = re.sub(r"\s+", " ", text).strip()
-    return [compact[i:i + chunk_chars] for i in range(0, len(compact), chunk_chars)]
+    compact = _WS_RE.sub(" ", text).strip()
+    chunks: list[str] = []
+    current: list[str] = []
+    current_len = 0
+    # Chunk chiusi a fine frase; taglio netto solo per frasi più lunghe del limite
+    for sentence in _SENTENCE_END_RE.split(compact):
+        if not sentence:
+            continue
+        added_len = len(sentence) + (1 if current else 0)
+        if current and current_len + added_len > chunk_chars:
+            chunks.append(" ".join(current))
+            current, current_len = [], 0
+            added_len = len(sentence)
+        if len(sentence) > chunk_chars:
+            chunks.extend(sentence[i:i + chunk_chars]
+                          for i in range(0, len(sentence), chunk_chars))
+            continue
+        current.append(sentence)
+        current_len += added_len
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def plan_chunk_ranges(
+    total_ms: int,
+    max_chunk_ms: int,
+    silence_ranges: Iterable[tuple[int, int]],
+    fallback_cut: Callable[[int, int], int] | None = None,
+) -> list[tuple[int, int]]:
+    cuts = sorted((start + end) // 2 for start, end in silence_ranges)
+    ranges: list[tuple[int, int]] = []
+    start = 0
+    while total_ms - start > max_chunk_ms:
+        limit = start + max_chunk_ms
+        idx = bisect.bisect_right(cuts, limit) - 1
+        # Pause nella prima metà ignorate: niente chunk brevissimi da inviare
+        if idx >= 0 and cuts[idx] >= start + max(1, max_chunk_ms // 2):
+            end = cuts[idx]
+        elif fallback_cut is not None:
+            # Nessuna pausa nel chunk: il chiamante sceglie il punto più quieto
+            end = fallback_cut(start, limit)
+            end = end if start < end <= limit else limit
+        else:
+            end = limit
+        ranges.append((start, end))
+        start = end
+    if total_ms > start:
+        ranges.append((start, total_ms))
+    return ranges
+
+
+def format_timestamp(ms: int) -> str:
+    minutes, seconds = divmod(int(ms) // 1000, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
 
 
 def count_words(text: str) -> int:
-    return len(re.findall(r"\w+", text or ""))
+    return len(_WORD_RE.findall(text or ""))
+
+
+def summary_word_count(markdown: str) -> int:
+    # Conteggio dichiarato dal modello (<!-- WORDS: n -->), altrimenti calcolato
+    match = _WORDS_TAG_RE.search(markdown or "")
+    return int(match.group(1)) if match else count_words(markdown)
 
 
 def to_any_dict_list(value: Any) -> list[dict[str, Any]]:
@@ -59,16 +155,24 @@ def to_any_dict_list(value: Any) -> list[dict[str, Any]]:
 
 
 def to_str_dict_list(value: Any) -> list[dict[str, str]]:
+    if not isinstance(value, list):
+        return []
+    # Un solo passaggio; str() solo sui valori che non sono già stringhe
     return [
-        {str(k): str(v) if v is not None else "" for k, v in item.items()}
-        for item in to_any_dict_list(value)
+        {
+            k if type(k) is str else str(k):
+            v if type(v) is str else ("" if v is None else str(v))
+            for k, v in cast(dict[Any, Any], item).items()
+        }
+        for item in cast(list[Any], value)
+        if isinstance(item, dict)
     ]
 
 
 def debug_preview(text: Any, limit: int = 120) -> str:
     if text is None:
         return "<None>"
-    compact = re.sub(r"\s+", " ", str(text)).strip()
+    compact = _WS_RE.sub(" ", str(text)).strip()
     return compact if len(compact) <= limit else compact[:limit] + "…"
 
 
@@ -86,85 +190,40 @@ def extract_json_candidate(text: str) -> Any | None:
         normalized = normalized.split("=", 1)[1].strip()
     normalized = normalized.replace("\\'", "'")
 
-    try:
-        return json.loads(normalized)
-    except Exception:
-        pass
-
-    markdown_match = re.search(
-        r"```json\s*([\{\[][^`]*?[\}\]])\s*```", normalized, re.IGNORECASE
-    )
+    markdown_match = _JSON_FENCE_RE.search(normalized)
     if markdown_match:
         try:
-            return json.loads(markdown_match.group(1))
+            return json_codec.loads(markdown_match.group(1))
         except Exception:
             pass
 
-    start_arr = normalized.find("[")
-    end_arr = normalized.rfind("]")
-    if start_arr != -1 and end_arr != -1 and end_arr > start_arr:
+    # Una sola scansione in avanti: raw_decode a partire da ogni [ o {,
+    # senza riprovare json.loads su fette dell'intero testo
+    decoder = json.JSONDecoder()
+    start_match = _JSON_START_RE.search(normalized)
+    while start_match:
         try:
-            return json.loads(normalized[start_arr:end_arr + 1])
-        except Exception:
-            pass
-
-    start_obj = normalized.find("{")
-    end_obj = normalized.rfind("}")
-    if start_obj != -1 and end_obj != -1 and end_obj > start_obj:
-        try:
-            return json.loads(normalized[start_obj:end_obj + 1])
-        except Exception:
-            pass
-
-    object_sequence = extract_top_level_json_objects(normalized)
-    if object_sequence:
-        if len(object_sequence) == 1:
-            return object_sequence[0]
-        return object_sequence
-
-    return None
-
-
-def extract_top_level_json_objects(text: str) -> list[dict[str, Any]]:
-    objects: list[dict[str, Any]] = []
-    in_string = False
-    escape = False
-    depth = 0
-    start = -1
-
-    for idx, ch in enumerate(text):
-        if in_string:
-            if escape:
-                escape = False
-            elif ch == "\\":
-                escape = True
-            elif ch == '"':
-                in_string = False
+            value, end = decoder.raw_decode(normalized, start_match.start())
+        except ValueError:
+            start_match = _JSON_START_RE.search(normalized, start_match.start() + 1)
             continue
+        if isinstance(value, list):
+            return value
+
+        # Oggetti top-level consecutivi (es. uno per riga) diventano una lista
+        objects: list[Any] = [value]
+        while True:
+            next_match = _JSON_OBJECT_GAP_RE.match(normalized, end)
+            if not next_match:
+                break
+            try:
+                value, end = decoder.raw_decode(normalized, next_match.end() - 1)
+            except ValueError:
+                break
+            objects.append(value)
+        return objects[0] if len(objects) == 1 else objects
 
-        if ch == '"':
-            in_string = True
-            continue
-
-        if ch == "{":
-            if depth == 0:
-                start = idx
-            depth += 1
-            continue
-
-        if ch == "}" and depth > 0:
-            depth -= 1
-            if depth == 0 and start != -1:
-                candidate = text[start:idx + 1]
-                try:
-                    parsed = json.loads(candidate)
-                    if isinstance(parsed, dict):
-                        objects.append(cast(dict[str, Any], parsed))
-                except Exception:
-                    pass
-                start = -1
-
-    return objects
+    return None
 
 
 def dedupe_dict_items(items: Iterable[dict[str, str]], key_fields: tuple[str, ...]) -> list[dict[str, str]]:
@@ -182,57 +241,135 @@ def dedupe_dict_items(items: Iterable[dict[str, str]], key_fields: tuple[str, ..
     return result
 
 
+# Tabelle dei prompt precompilate per lingua: ogni builder seleziona la
+# tabella una sola volta invece di ramificare su ogni stringa.
+_PROMPTS_IT: dict[str, Any] = {
+    "notes_label": "NOTE COMPLETE",
+    "system_academic": "Sei un assistente accademico. Sii fedele alla fonte e non inventare informazioni.",
+    "map_user": (
+        "Per il chunk di trascrizione qui sotto:\n"
+        "1) Estrai i concetti chiave numerati.\n"
+        "2) Elenca termini tecnici con brevi definizioni.\n"
+        "3) Proponi un mini-outline (max 2 livelli).\n\n"
+        "CHUNK {idx}/{total}:\n{chunk_text}"
+    ),
+    "reduce_user": (
+        "Unisci le note qui sotto in:\n"
+        "A) OUTLINE complessivo (max 3 livelli)\n"
+        "B) KEY POINTS (bullet concisi)\n"
+        "C) GLOSSARY CANDIDATES (termini: definizione breve)\n\n"
+        "NOTE PARZIALI:\n{notes_block}"
+    ),
+    "summary_user": (
+        "In base alle NOTE COMPLETE qui sopra, scrivi un **riassunto corposo** in Markdown "
+        "tra {target_min}-{target_max} parole, "
+        "con titoli (#, ##, ###), esempi e formule testuali. Scrivi in italiano.\n"
+        "Non inventare; se un’informazione non è nelle note, omettila.\n\n"
+        "Al termine, aggiungi una riga HTML commentata con il conteggio parole con esatta sintassi:\n"
+        "<!-- WORDS: <numero> -->"
+    ),
+    "summary_retry": "\n\n[NOTA: amplia copertura di esempi/applicazioni pratiche e casi limite.]",
+    "list_user": (
+        "In base alle NOTE COMPLETE qui sopra, genera **esattamente {remaining}** elementi di tipo {kind}. "
+        "Non ripetere concetti già usati. Non inventare oltre le note. "
+        "Rispetta rigorosamente lo schema JSON richiesto.\n\n"
+    ),
+    "list_used": "\n\nGià generati (non ripeterli):\n{used_block}",
+    "schema": {
+        "questions": 'Restituisci **SOLO** JSON (lista) della forma:\n[{"q":"...", "a":"...", "difficulty":"facile|medio|difficile"}, ...]\n',
+        "flashcards": 'Restituisci **SOLO** JSON (lista) della forma:\n[{"front":"...", "back":"..."}, ...]\n',
+        "glossary": 'Restituisci **SOLO** JSON (lista) della forma:\n[{"term":"...", "definition":"..."}, ...]\n',
+    },
+    "abstract_user": (
+        "Scrivi un abstract di 6-8 frasi, fedele alle NOTE COMPLETE qui sopra. "
+        "Niente liste, solo prosa."
+    ),
+    "outline_user": (
+        "Dalle NOTE COMPLETE qui sopra crea un outline gerarchico (max 3 livelli) in JSON della forma "
+        '[{{"title":"...", "children":[...]}}]. SOLO JSON.'
+    ),
+    "keypoints_user": "Estrai 10-16 punti chiave sintetici (bullet singola riga) dalle NOTE COMPLETE qui sopra.",
+}
+
+_PROMPTS_EN: dict[str, Any] = {
+    "notes_label": "COMPLETE NOTES",
+    "system_academic": "You are an academic assistant. Be faithful to the source and do not invent facts.",
+    "map_user": (
+        "For the transcript chunk below:\n"
+        "1) Extract numbered key concepts.\n"
+        "2) List technical terms with short definitions.\n"
+        "3) Propose a mini-outline (max 2 levels).\n\n"
+        "CHUNK {idx}/{total}:\n{chunk_text}"
+    ),
+    "reduce_user": (
+        "Merge the notes below into:\n"
+        "A) A global OUTLINE (max 3 levels)\n"
+        "B) KEY POINTS (concise bullets)\n"
+        "C) GLOSSARY CANDIDATES (term: short definition)\n\n"
+        "PARTIAL NOTES:\n{notes_block}"
+    ),
+    "summary_user": (
+        "Using the {notes_label} above, write a **substantial** Markdown summary "
+        "between {target_min}-{target_max} words, "
+        "with headings (#, ##, ###), examples, and textual formulas. "
+        "Write in English.\n"
+        "Do not invent facts; if information is not in the notes, omit it.\n\n"
+        "At the end, add one HTML comment line with exact syntax:\n"
+        "<!-- WORDS: <number> -->"
+    ),
+    "summary_retry": "\n\n[NOTE: expand coverage of examples, practical applications, and edge cases.]",
+    "list_user": (
+        "From the {notes_label} above, generate **exactly {remaining}** {kind} items. "
+        "Do not repeat concepts already used. Do not invent beyond the notes. "
+        "Strictly follow the required JSON schema.\n\n"
+    ),
+    "list_used": "\n\nAlready generated (do not repeat):\n{used_block}",
+    "schema": {
+        "questions": 'Return **ONLY** JSON (array) in this form:[{"q":"...", "a":"...", "difficulty":"easy|medium|hard"}, ...]',
+        "flashcards": 'Return **ONLY** JSON (array) in this form:[{"front":"...", "back":"..."}, ...]',
+        "glossary": 'Return **ONLY** JSON (array) in this form:[{"term":"...", "definition":"..."}, ...]',
+    },
+    "abstract_user": (
+        "Write an abstract of 6-8 sentences, faithful to the {notes_label} above. "
+        "No bullet lists, prose only."
+    ),
+    "outline_user": (
+        "From the {notes_label} above, create a hierarchical outline (max 3 levels) in JSON with this shape "
+        '[{{"title":"...", "children":[...]}}]. ONLY JSON.'
+    ),
+    "keypoints_user": "Extract 10-16 concise key points (single-line bullets) from the {notes_label} above.",
+}
+
+_PROMPTS_BY_LANGUAGE: dict[PromptLanguage, dict[str, Any]] = {"it": _PROMPTS_IT, "en": _PROMPTS_EN}
+
+
+def prompt_templates(current_language: str) -> dict[str, Any]:
+    return _PROMPTS_BY_LANGUAGE[normalize_current_language(current_language)]
+
+
 def notes_label(current_language: str) -> str:
-    return "COMPLETE NOTES" if normalize_current_language(current_language) == "en" else "NOTE COMPLETE"
+    return prompt_templates(current_language)["notes_label"]
 
 
 def academic_system_prompt(current_language: str) -> str:
-    if normalize_current_language(current_language) == "en":
-        return "You are an academic assistant. Be faithful to the source and do not invent facts."
-    return "Sei un assistente accademico. Sii fedele alla fonte e non inventare informazioni."
+    return prompt_templates(current_language)["system_academic"]
 
 
 def build_map_chunk_prompt(*, current_language: str, idx: int, total: int, chunk_text: str) -> str:
-    if normalize_current_language(current_language) == "en":
-        return (
-            f"This is transcript chunk {idx}/{total}.\n"
-            "1) Extract numbered key concepts.\n"
-            "2) List technical terms with short definitions.\n"
-            "3) Propose a mini-outline (max 2 levels).\n\n"
-            f"CHUNK:\n{chunk_text}"
-        )
-    return (
-        f"Questo è il chunk {idx}/{total} della trascrizione.\n"
-        "1) Estrai i concetti chiave numerati.\n"
-        "2) Elenca termini tecnici con brevi definizioni.\n"
-        "3) Proponi un mini-outline (max 2 livelli).\n\n"
-        f"CHUNK:\n{chunk_text}"
-    )
+    # Istruzioni fisse in testa, parti variabili in coda: prefisso comune a
+    # tutte le chiamate della fase map
+    return prompt_templates(current_language)["map_user"].format(idx=idx, total=total, chunk_text=chunk_text)
 
 
 def build_reduce_prompt(*, current_language: str, partials: list[str]) -> str:
     notes_block = "\n\n---\n\n".join(partials)
-    if normalize_current_language(current_language) == "en":
-        return (
-            "Merge the notes below into:\n"
-            "A) A global OUTLINE (max 3 levels)\n"
-            "B) KEY POINTS (concise bullets)\n"
-            "C) GLOSSARY CANDIDATES (term: short definition)\n\n"
-            "PARTIAL NOTES:\n" + notes_block
-        )
-    return (
-        "Unisci le note qui sotto in:\n"
-        "A) OUTLINE complessivo (max 3 livelli)\n"
-        "B) KEY POINTS (bullet concisi)\n"
-        "C) GLOSSARY CANDIDATES (termini: definizione breve)\n\n"
-        "NOTE PARZIALI:\n" + notes_block
-    )
+    return prompt_templates(current_language)["reduce_user"].format(notes_block=notes_block)
 
 
-def summary_system_prompt(current_language: str) -> str:
-    if normalize_current_language(current_language) == "en":
-        return "You are an academic assistant. Produce summaries in English, structured in Markdown."
-    return "Sei un assistente accademico. Produci riassunti in italiano, strutturati in Markdown."
+def notes_prompt_prefix(notes: str, notes_label_value: str) -> str:
+    # Prefisso identico per tutte le sezioni: le note vengono prima del compito,
+    # così il provider può riusare la cache del prompt tra le chiamate.
+    return f"{notes_label_value}:\n{notes}\n\n---\n"
 
 
 def build_summary_prompt(
@@ -242,53 +379,20 @@ def build_summary_prompt(
     notes_label_value: str,
     target_min: int,
     target_max: int,
+    retry_note: str = "",
 ) -> str:
-    if normalize_current_language(current_language) == "en":
-        return (
-            f"Using the {notes_label_value} below, write a **substantial** Markdown summary "
-            f"between {target_min}-{target_max} words, "
-            "with headings (#, ##, ###), examples, and textual formulas. "
-            "Write in English.\n"
-            "Do not invent facts; if information is not in the notes, omit it.\n\n"
-            "At the end, add one HTML comment line with exact syntax:\n"
-            "<!-- WORDS: <number> -->\n\n"
-            f"{notes_label_value}:\n{notes}"
-        )
-    return (
-        "In base alle NOTE COMPLETE qui sotto, scrivi un **riassunto corposo** in Markdown "
-        f"tra {target_min}-{target_max} parole, "
-        "con titoli (#, ##, ###), esempi e formule testuali. "
-        "Non inventare; se un’informazione non è nelle note, omettila.\n\n"
-        "Al termine, aggiungi una riga HTML commentata con il conteggio parole con esatta sintassi:\n"
-        "<!-- WORDS: <numero> -->\n\n"
-        "NOTE COMPLETE:\n" + notes
+    task = prompt_templates(current_language)["summary_user"].format(
+        notes_label=notes_label_value, target_min=target_min, target_max=target_max
     )
+    return notes_prompt_prefix(notes, notes_label_value) + task + retry_note
 
 
 def summary_retry_note(current_language: str) -> str:
-    if normalize_current_language(current_language) == "en":
-        return "\n\n[NOTE: expand coverage of examples, practical applications, and edge cases.]"
-    return "\n\n[NOTA: amplia copertura di esempi/applicazioni pratiche e casi limite.]"
+    return prompt_templates(current_language)["summary_retry"]
 
 
 def list_schema_examples(current_language: str) -> dict[str, str]:
-    if normalize_current_language(current_language) == "en":
-        return {
-            "questions": 'Return **ONLY** JSON (array) in this form:[{"q":"...", "a":"...", "difficulty":"easy|medium|hard"}, ...]',
-            "flashcards": 'Return **ONLY** JSON (array) in this form:[{"front":"...", "back":"..."}, ...]',
-            "glossary": 'Return **ONLY** JSON (array) in this form:[{"term":"...", "definition":"..."}, ...]',
-        }
-    return {
-        "questions": 'Restituisci **SOLO** JSON (lista) della forma:\n[{"q":"...", "a":"...", "difficulty":"facile|medio|difficile"}, ...]\n',
-        "flashcards": 'Restituisci **SOLO** JSON (lista) della forma:\n[{"front":"...", "back":"..."}, ...]\n',
-        "glossary": 'Restituisci **SOLO** JSON (lista) della forma:\n[{"term":"...", "definition":"..."}, ...]\n',
-    }
-
-
-def list_system_prompt(current_language: str) -> str:
-    if normalize_current_language(current_language) == "en":
-        return "You are an academic assistant. Strictly follow the required JSON schema."
-    return "Sei un assistente accademico. Rispetta rigorosamente lo schema JSON richiesto."
+    return dict(prompt_templates(current_language)["schema"])
 
 
 def build_list_prompt(
@@ -299,56 +403,28 @@ def build_list_prompt(
     kind: str,
     remaining: int,
     schema_example: str,
+    already_used: Iterable[str] = (),
 ) -> str:
-    if normalize_current_language(current_language) == "en":
-        return (
-            f"From the {notes_label_value} below, generate **exactly {remaining}** {kind} items. "
-            "Do not repeat concepts already used. Do not invent beyond the notes.\n\n"
-            + schema_example + f"\n{notes_label_value}:\n" + notes
-        )
-    return (
-        f"In base alle NOTE COMPLETE qui sotto, genera **esattamente {remaining}** elementi di tipo {kind}. "
-        "Non ripetere concetti già usati. Non inventare oltre le note.\n\n"
-        + schema_example + "\nNOTE COMPLETE:\n" + notes
-    )
+    prompts = prompt_templates(current_language)
+    used_block = "\n".join(f"- {item}" for item in already_used)
+    task = prompts["list_user"].format(notes_label=notes_label_value, remaining=remaining, kind=kind)
+    used = prompts["list_used"].format(used_block=used_block) if used_block else ""
+    return notes_prompt_prefix(notes, notes_label_value) + task + schema_example + used
 
 
 def build_abstract_prompt(*, current_language: str, notes_text: str, notes_label_value: str) -> str:
-    if normalize_current_language(current_language) == "en":
-        return (
-            f"Write an abstract of 6-8 sentences, faithful to the {notes_label_value} below. "
-            f"No bullet lists, prose only. {notes_label_value}:\n" + notes_text
-        )
-    return (
-        "Scrivi un abstract di 6-8 frasi, fedele alle NOTE COMPLETE qui sotto. "
-        "Niente liste, solo prosa. NOTE COMPLETE:\n" + notes_text
-    )
+    task = prompt_templates(current_language)["abstract_user"].format(notes_label=notes_label_value)
+    return notes_prompt_prefix(notes_text, notes_label_value) + task
 
 
 def build_outline_prompt(*, current_language: str, notes_text: str, notes_label_value: str) -> str:
-    lead = (
-        f"From the {notes_label_value}, create a hierarchical outline (max 3 levels) in JSON with this shape "
-        if normalize_current_language(current_language) == "en"
-        else "Dalle NOTE COMPLETE crea un outline gerarchico (max 3 livelli) in JSON della forma "
-    )
-    tail = (
-        "ONLY JSON.\n\n" + f"{notes_label_value}:\n"
-        if normalize_current_language(current_language) == "en"
-        else "SOLO JSON.\n\nNOTE COMPLETE:\n"
-    )
-    return lead + '[{"title":"...", "children":[...]}]. ' + tail + notes_text
+    task = prompt_templates(current_language)["outline_user"].format(notes_label=notes_label_value)
+    return notes_prompt_prefix(notes_text, notes_label_value) + task
 
 
 def build_keypoints_prompt(*, current_language: str, notes_text: str, notes_label_value: str) -> str:
-    if normalize_current_language(current_language) == "en":
-        return (
-            "Extract 10-16 concise key points (single-line bullets) from the "
-            f"{notes_label_value}:\n" + notes_text
-        )
-    return (
-        "Estrai 10-16 punti chiave sintetici (bullet singola riga) dalle NOTE COMPLETE:\n"
-        + notes_text
-    )
+    task = prompt_templates(current_language)["keypoints_user"].format(notes_label=notes_label_value)
+    return notes_prompt_prefix(notes_text, notes_label_value) + task
 
 
 def normalize_outline_nodes(value: Any) -> list[dict[str, Any]]:
@@ -363,59 +439,49 @@ def parse_key_points(text: str) -> list[str]:
 
 def render_outline_text(outline: Any) -> str:
     lines: list[str] = []
-
-    def walk(nodes: Any, level: int = 0) -> None:
-        for node in to_any_dict_list(nodes):
-            title = str(node.get("title", "")).strip()
-            lines.append("  " * level + ("- " + title if title else "-"))
-            walk(node.get("children", []), level + 1)
-
-    walk(outline)
+    indents = [""]
+    # DFS iterativa: lo stack contiene i figli in ordine inverso
+    stack = [(node, 0) for node in reversed(to_any_dict_list(outline))]
+    while stack:
+        node, level = stack.pop()
+        while len(indents) <= level:
+            indents.append(indents[-1] + "  ")
+        title = str(node.get("title", "")).strip()
+        lines.append(indents[level] + ("- " + title if title else "-"))
+        children = to_any_dict_list(node.get("children", []))
+        stack.extend((child, level + 1) for child in reversed(children))
     return "\n".join(lines)
 
 
 def render_key_points_text(key_points: Any) -> str:
     if isinstance(key_points, list):
-        return "\n".join(str(item) for item in cast(list[Any], key_points))
+        return "\n".join([str(item) for item in cast(list[Any], key_points)])
     return str(key_points or "")
 
 
 def render_questions_text(questions: Any, *, answer_label: str, difficulty_label: str) -> str:
-    lines: list[str] = []
-    for i, qa in enumerate(to_any_dict_list(questions), 1):
-        question_text = str(qa.get("q", "")).strip()
-        answer_text = str(qa.get("a", "")).strip()
-        difficulty_text = str(qa.get("difficulty", "")).strip()
-        lines.append(
-            f"{i:02d}) {question_text}\n"
-            f"   {answer_label}: {answer_text}\n"
-            f"   {difficulty_label}: {difficulty_text}\n"
-        )
-    return "\n".join(lines)
+    return "\n".join([
+        f"{i:02d}) {str(qa.get('q', '')).strip()}\n"
+        f"   {answer_label}: {str(qa.get('a', '')).strip()}\n"
+        f"   {difficulty_label}: {str(qa.get('difficulty', '')).strip()}\n"
+        for i, qa in enumerate(to_any_dict_list(questions), 1)
+    ])
 
 
 def render_flashcards_text(flashcards: Any) -> str:
-    lines: list[str] = []
-    for i, fc in enumerate(to_any_dict_list(flashcards), 1):
-        lines.append(
-            (
-                f"{i:02d}) FRONT: {str(fc.get('front', '')).strip()}\n"
-                f"    BACK: {str(fc.get('back', '')).strip()}\n"
-            )
-        )
-    return "\n".join(lines)
+    return "\n".join([
+        f"{i:02d}) FRONT: {str(fc.get('front', '')).strip()}\n"
+        f"    BACK: {str(fc.get('back', '')).strip()}\n"
+        for i, fc in enumerate(to_any_dict_list(flashcards), 1)
+    ])
 
 
 def render_glossary_text(glossary: Any) -> str:
-    lines: list[str] = []
-    for term in to_any_dict_list(glossary):
-        lines.append(
-            (
-                f"- {str(term.get('term', '')).strip()}: "
-                f"{str(term.get('definition', '')).strip()}"
-            )
-        )
-    return "\n".join(lines)
+    return "\n".join([
+        f"- {str(term.get('term', '')).strip()}: "
+        f"{str(term.get('definition', '')).strip()}"
+        for term in to_any_dict_list(glossary)
+    ])
 
 
 def parse_flashcards_from_text(text: str) -> list[dict[str, str]]:
@@ -444,8 +510,15 @@ def build_flashcards_csv_rows(cards: Any) -> list[list[str]]:
     return rows
 
 
+def render_flashcards_csv(cards: Any) -> str:
+    buf = io.StringIO()
+    csv.writer(buf, quoting=csv.QUOTE_ALL).writerows(
+        build_flashcards_csv_rows(cards))
+    return buf.getvalue()
+
+
 def safe_name(value: str) -> str:
-    return re.sub(r"[^a-zA-Z0-9_-]+", "_", value).strip("_") or "output"
+    return _SAFE_NAME_RE.sub("_", value).strip("_") or "output"
 
 
 def build_postprocess_plan(*, target_questions: int, target_flashcards: int, target_glossary: int) -> list[PostprocessStep]:
@@ -1,8 +1,56 @@
+import logging
+import threading
 from typing import Any, cast
 
-from groq import Groq
-
-from .provider_protocols import GroqClientLike, LLMClientLike, TranscriptionClientLike
+import httpx
+from groq import DefaultHttpxClient, Groq
+
+from .config import GROQ_MAX_RETRIES
+from .provider_protocols import (
+    AudioBytes,
+    CompletionStreamLike,
+    GroqClientLike,
+    LLMClientLike,
+    TokenCallback,
+    TranscriptionClientLike,
+)
+
+GROQ_TIMEOUT_SEC = 120.0
+GROQ_HTTP_LIMITS = httpx.Limits(
+    max_connections=32, max_keepalive_connections=16)
+
+LOGGER = logging.getLogger(__name__)
+
+_CLIENTS: dict[str, GroqClientLike] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_groq_client(api_key: str) -> GroqClientLike:
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(api_key)
+        if client is None:
+            groq_factory = cast(Any, Groq)
+            client = cast(GroqClientLike, groq_factory(
+                api_key=api_key,
+                timeout=GROQ_TIMEOUT_SEC,
+                # L'SDK ritenta 408/409/429/5xx ed errori di connessione con
+                # backoff esponenziale e jitter, rispettando retry-after
+                max_retries=GROQ_MAX_RETRIES,
+                http_client=DefaultHttpxClient(limits=GROQ_HTTP_LIMITS),
+            ))
+            _CLIENTS[api_key] = client
+        return client
+
+
+def _log_prompt_cache_usage(usage: Any) -> None:
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", None)
+    if cached_tokens is None:
+        return
+    LOGGER.info("Groq: %s/%s token di prompt serviti dalla cache",
+                cached_tokens, getattr(usage, "prompt_tokens", "?"))
 
 
 class GroqTranscriptionClient:
@@ -11,15 +59,15 @@ class GroqTranscriptionClient:
 
     def transcribe(
         self,
-        audio: str | None = None,
+        audio: str | AudioBytes | None = None,
         *,
         wav_path: str | None = None,
         model: str | None = None,
         lang: str = "auto",
         language: str | None = None,
     ) -> str:
-        audio_path = audio or wav_path
-        if not audio_path:
+        audio_input = audio or wav_path
+        if not audio_input:
             raise ValueError("audio (or wav_path) is required")
         if not model:
             raise ValueError("model is required for Groq transcription")
@@ -28,16 +76,20 @@ class GroqTranscriptionClient:
         if effective_language is None:
             effective_language = None if lang == "auto" else lang
 
-        with open(audio_path, "rb") as f:
-            transcription_args: dict[str, Any] = {
-                "file": f,
-                "model": model,
-                "temperature": 0.0,
-            }
-            if effective_language:
-                transcription_args["language"] = effective_language
+        transcription_args: dict[str, Any] = {
+            "model": model,
+            "temperature": 0.0,
+        }
+        if effective_language:
+            transcription_args["language"] = effective_language
+
+        if isinstance(audio_input, str):
+            with open(audio_input, "rb") as f:
+                transcription = self._client.audio.transcriptions.create(
+                    file=f, **transcription_args)
+        else:
             transcription = self._client.audio.transcriptions.create(
-                **transcription_args)
+                file=audio_input, **transcription_args)
         return getattr(transcription, "text", None) or str(transcription)
 
 
@@ -48,27 +100,52 @@ class GroqLLMClient:
         self._temperature = temperature
         self._max_tokens = max_tokens
 
-    def complete(self, *, system: str, user: str) -> str:
-        resp = self._client.chat.completions.create(
-            model=self._model,
-            messages=[
+    def complete(self, *, system: str, user: str, on_token: TokenCallback | None = None,
+                 max_tokens: int | None = None) -> str:
+        request_args: dict[str, Any] = {
+            "model": self._model,
+            "messages": [
                 {"role": "system", "content": system},
                 {"role": "user", "content": user},
             ],
-            temperature=self._temperature,
-            max_tokens=self._max_tokens,
-        )
+            "temperature": self._temperature,
+            "max_tokens": max_tokens or self._max_tokens,
+        }
+        if on_token is not None:
+            return self._complete_stream(request_args, on_token)
+
+        resp = self._client.chat.completions.create(**request_args)
         if not resp:
             raise RuntimeError("Risposta vuota da Groq API.")
+        _log_prompt_cache_usage(getattr(resp, "usage", None))
         if not resp.choices:
             raise RuntimeError("Nessuna scelta nella risposta Groq.")
         return str(resp.choices[0].message.content).strip()
 
+    def _complete_stream(self, request_args: dict[str, Any], on_token: TokenCallback) -> str:
+        stream = cast(
+            CompletionStreamLike,
+            self._client.chat.completions.create(**request_args, stream=True),
+        )
+        parts: list[str] = []
+        for chunk in stream:
+            # L'uso dei token arriva solo nell'ultimo chunk dello stream
+            x_groq = getattr(chunk, "x_groq", None)
+            _log_prompt_cache_usage(getattr(x_groq, "usage", None))
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content or ""
+            if token:
+                parts.append(token)
+                on_token(token)
+        if not parts:
+            raise RuntimeError("Risposta vuota da Groq API.")
+        return "".join(parts).strip()
+
 
 def create_groq_llm_client(*, api_key: str, model: str, temperature: float, max_tokens: int) -> LLMClientLike:
-    groq_factory = cast(Any, Groq)
     return GroqLLMClient(
-        groq_factory(api_key=api_key),
+        get_groq_client(api_key),
         model=model,
         temperature=temperature,
         max_tokens=max_tokens,
@@ -76,8 +153,7 @@ def create_groq_llm_client(*, api_key: str, model: str, temperature: float, max_
 
 
 def create_groq_transcription_client(*, api_key: str) -> TranscriptionClientLike:
-    groq_factory = cast(Any, Groq)
-    return GroqTranscriptionClient(groq_factory(api_key=api_key))
+    return GroqTranscriptionClient(get_groq_client(api_key))
 
 
 class GrokProvider:
@@ -1,8 +1,14 @@
-from typing import cast
+from typing import Any, cast
 
 from ollama import Client as OllamaClient
 
-from .provider_protocols import LLMClientLike, OllamaChatResponseLike, OllamaClientLike
+from .provider_protocols import (
+    LLMClientLike,
+    OllamaChatResponseLike,
+    OllamaChatStreamLike,
+    OllamaClientLike,
+    TokenCallback,
+)
 
 
 class OllamaLLMClient:
@@ -13,25 +19,37 @@ class OllamaLLMClient:
         self._temperature = temperature
         self._max_tokens = max_tokens
 
-    def complete(self, *, system: str, user: str) -> str:
+    def complete(self, *, system: str, user: str, on_token: TokenCallback | None = None,
+                 max_tokens: int | None = None) -> str:
+        request_args: dict[str, Any] = {
+            "model": self._model,
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": user},
+            ],
+            "options": {
+                "temperature": self._temperature,
+                "num_predict": max_tokens or self._max_tokens,
+            },
+        }
+        streamed = ""
         try:
-            parsed: OllamaChatResponseLike = self._client.chat(
-                model=self._model,
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user},
-                ],
-                options={
-                    "temperature": self._temperature,
-                    "num_predict": self._max_tokens,
-                },
-            )
+            if on_token is not None:
+                streamed = self._complete_stream(request_args, on_token)
+            else:
+                parsed: OllamaChatResponseLike = self._client.chat(
+                    **request_args)
         except Exception as exc:
             raise RuntimeError(
                 f"Impossibile contattare Ollama su {self._host}. "
                 f"Avvia il server Ollama e verifica OLLAMA_BASE_URL. Dettaglio: {exc}"
             ) from exc
 
+        if on_token is not None:
+            if not streamed:
+                raise RuntimeError("Risposta Ollama vuota o non valida.")
+            return streamed
+
         content_str = str(parsed.message.content).strip()
         if not content_str:
             message_any = parsed.message
@@ -40,6 +58,17 @@ class OllamaLLMClient:
                 f"Risposta Ollama vuota o non valida. message_type={message_type}")
         return content_str
 
+    def _complete_stream(self, request_args: dict[str, Any], on_token: TokenCallback) -> str:
+        stream = cast(OllamaChatStreamLike, self._client.chat(
+            **request_args, stream=True))
+        parts: list[str] = []
+        for part in stream:
+            token = str(part.message.content or "")
+            if token:
+                parts.append(token)
+                on_token(token)
+        return "".join(parts).strip()
+
 
 class OllamaProvider:
     def __init__(self, *, host: str):
@@ -1,44 +1,69 @@
-import json
+import logging
 import os
-import re
 import shutil
+import subprocess
 import sys
-from typing import Any, cast
-
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from typing import Any, Callable, cast
+
+from . import json_codec
+from .cache import (
+    CachedLLMClient,
+    CachedTranscriptionClient,
+    JsonDiskCache,
+    file_sha256,
+    text_sha256,
+)
 from .fp_core import (
+    PostprocessStep,
     academic_system_prompt,
     build_list_prompt,
     build_map_chunk_prompt,
     build_reduce_prompt,
     build_summary_prompt,
-    count_words,
     debug_preview,
+    dedupe_transcript,
     extract_json_candidate,
     list_schema_examples,
-    list_system_prompt,
     notes_label,
     normalize_current_language,
+    plan_chunk_ranges,
     split_text_chunks,
     summary_retry_note,
-    summary_system_prompt,
+    summary_word_count,
     to_str_dict_list,
 )
 
 from .config import (
+    AUDIO_SAMPLE_RATE,
+    CACHE_ENABLED,
     CHUNK_CHARLEN,
+    CHUNK_CUT_SEARCH_MS,
     FASTER_WHISPER_COMPUTE_TYPE,
     FASTER_WHISPER_DEVICE,
+    FULL_CONTEXT_CHARLEN,
     GROQ_API_KEY,
+    LIST_EXTRA_ITEMS,
+    LLM_CONCURRENCY,
     LLM_MAX_TOKENS,
+    LLM_MAX_TOKENS_SUMMARY,
     LLM_MODEL,
     LLM_TEMP,
     OLLAMA_BASE_URL,
     OLLAMA_MODEL,
+    SILENCE_MIN_LEN_MS,
+    SILENCE_THRESH_OFFSET_DB,
+    SILENT_CHUNK_RMS,
+    TARGET_SUMMARY_WORDS_MAX,
+    TARGET_SUMMARY_WORDS_MIN,
 )
+from .provider_protocols import AudioBytes
 from .providers import (
-    AudioSegment,
     LLMClientLike,
     TranscriptionClientLike,
+    audio_segment_class,
     create_llm_client_for_provider,
     create_transcription_client_for_provider,
     normalize_llm_provider,
@@ -46,12 +71,30 @@ from .providers import (
 )
 from .translations import TRANSLATIONS
 
+LOGGER = logging.getLogger(__name__)
+
+NOTES_CACHE_SIZE = 8
+
+# Sorgenti già compresse che possono essere tagliate senza ricodifica,
+# con il muxer ffmpeg adatto a scrivere su pipe
+STREAM_COPY_MUXERS: dict[str, tuple[str, ...]] = {
+    ".mp3": ("-f", "mp3"),
+    ".m4a": ("-f", "mp4", "-movflags", "frag_keyframe+empty_moov"),
+}
+
 
 class ProcessingMixin:
     status_var: Any
     transcription_provider_var: Any
     llm_provider_var: Any
     ui_lang: str
+    # Ultimo audio decodificato: (path, mtime, segmento mono/16 kHz)
+    _cached_audio: tuple[str, float, Any] | None = None
+    # Client di trascrizione riusati tra le esecuzioni, uno per provider (il
+    # modello faster-whisper viene caricato una sola volta)
+    _transcription_clients: dict[tuple[str, str, str], TranscriptionClientLike]
+    # Note map-reduce più recenti, per hash di trascrizione/modello/lingua
+    _notes_cache: OrderedDict[str, str]
 
     def _t(self, key: str, **kwargs: Any) -> str:
         language_map = TRANSLATIONS.get(
@@ -105,26 +148,52 @@ class ProcessingMixin:
     def _transcription_provider(self) -> str:
         return self._normalize_transcription_provider(self.transcription_provider_var.get())
 
-    def _create_transcription_client(self, api_key: str, model_name: str) -> TranscriptionClientLike:
-        return create_transcription_client_for_provider(
-            provider=self._transcription_provider(),
+    def _create_transcription_client(self, api_key: str, model_name: str, provider: str) -> TranscriptionClientLike:
+        client_key = (provider, api_key, model_name)
+        cached_client = self._transcription_clients.get(client_key)
+        if cached_client is not None:
+            return cached_client
+
+        client = create_transcription_client_for_provider(
+            provider=provider,
             api_key=api_key,
             model_name=model_name,
             device=FASTER_WHISPER_DEVICE,
             compute_type=FASTER_WHISPER_COMPUTE_TYPE,
         )
+        if CACHE_ENABLED:
+            client = CachedTranscriptionClient(
+                client, JsonDiskCache("chunks"), provider)
+        # Un solo client per provider: cambiando modello il precedente (ad es.
+        # un modello faster-whisper già caricato) non resta in memoria
+        for stale_key in [k for k in self._transcription_clients if k[0] == provider]:
+            del self._transcription_clients[stale_key]
+        self._transcription_clients[client_key] = client
+        return client
+
+    def _transcript_cache_key(self, provider: str, path: str, model: str, lang: str, chunk_sec: int) -> str:
+        return text_sha256(
+            provider,
+            model,
+            lang,
+            str(chunk_sec),
+            file_sha256(path),
+        )
 
-    def _transcribe_audio_chunk(self, client: Any, wav_path: str, model: str, lang: str) -> str:
+    def _transcribe_audio_chunk(self, client: Any, audio: AudioBytes, model: str, lang: str) -> str:
         transcription_client = cast(TranscriptionClientLike, client)
-        return transcription_client.transcribe(wav_path=wav_path, model=model, lang=lang)
+        return transcription_client.transcribe(audio, model=model, lang=lang)
 
     def _llm_provider(self) -> str:
         return self._normalize_llm_provider(self.llm_provider_var.get())
 
-    def _create_llm_client(self, api_key: str) -> Any:
-        provider = self._llm_provider()
+    def _llm_model_id(self, provider: str) -> str:
+        model = OLLAMA_MODEL if provider == "ollama" else LLM_MODEL
+        return f"{provider}:{model}"
+
+    def _create_llm_client(self, api_key: str, provider: str) -> Any:
         model = OLLAMA_MODEL if provider == "ollama" else LLM_MODEL
-        return create_llm_client_for_provider(
+        client = create_llm_client_for_provider(
             provider=provider,
             api_key=api_key,
             model=model,
@@ -132,10 +201,28 @@ class ProcessingMixin:
             max_tokens=LLM_MAX_TOKENS,
             host=OLLAMA_BASE_URL,
         )
-
-    def _llm(self, client: Any, system: str, user: str) -> str:
+        return client
+
+    def _llm(self, client: Any, system: str, user: str, stream_section: str | None = None,
+             max_tokens: int | None = None) -> str:
+        # Annullamento o chiusura della finestra: nessuna nuova chiamata, anche
+        # dai pool di map/sezioni e dai tentativi ripetuti
+        cancel_event = getattr(self, "cancel_event", None)
+        if cancel_event is not None and cancel_event.is_set():
+            raise CancelledError()
         llm_client = cast(LLMClientLike, client)
-        return llm_client.complete(system=system, user=user)
+        queue_obj = getattr(self, "msg_queue", None)
+        if stream_section is None or queue_obj is None:
+            return llm_client.complete(system=system, user=user, max_tokens=max_tokens)
+
+        queue_obj.put(("section_reset", stream_section))
+        return llm_client.complete(
+            system=system,
+            user=user,
+            on_token=lambda token: queue_obj.put(
+                ("section_token", (stream_section, token))),
+            max_tokens=max_tokens,
+        )
 
     def _current_language(self) -> str:
         return normalize_current_language(self.ui_lang)
@@ -146,58 +233,124 @@ class ProcessingMixin:
     def _llm_academic_system_prompt(self) -> str:
         return academic_system_prompt(self._current_language())
 
-    def _map_reduce_notes(self, client: Any, transcript_text: str) -> str:
-        system = self._llm_academic_system_prompt()
-        chunks = split_text_chunks(transcript_text, CHUNK_CHARLEN)
-
-        partials: list[str] = []
-        current_language = self._current_language()
-        for idx, ch in enumerate(chunks, 1):
+    def _map_reduce_notes(self, client: Any, transcript_text: str, current_language: str) -> str:
+        system = academic_system_prompt(current_language)
+        compact = dedupe_transcript(transcript_text)
+        if len(compact) <= FULL_CONTEXT_CHARLEN:
+            # Il testo entra nel contesto: prompt di reduce direttamente sulla trascrizione
+            reduce_user = build_reduce_prompt(
+                current_language=current_language, partials=[compact])
+            return self._llm(client, system, reduce_user)
+        chunks = split_text_chunks(compact, CHUNK_CHARLEN)
+
+        total = len(chunks)
+        completed = 0
+        completed_lock = threading.Lock()
+        queue_obj = getattr(self, "msg_queue", None)
+
+        def map_chunk(idx: int, ch: str) -> str:
+            nonlocal completed
             user = build_map_chunk_prompt(
                 current_language=current_language,
                 idx=idx,
-                total=len(chunks),
+                total=total,
                 chunk_text=ch,
             )
             out = self._llm(client, system, user)
-            partials.append(out)
+            with completed_lock:
+                completed += 1
+                current = completed
+            if queue_obj is not None:
+                queue_obj.put(
+                    ("status", self._t("status_llm_notes_chunk", current=current, total=total)))
+            return out
+
+        # Fase map in parallelo: ex.map preserva l'ordine dei chunk
+        ex = ThreadPoolExecutor(max_workers=min(LLM_CONCURRENCY, max(1, total)))
+        try:
+            partials = list(ex.map(map_chunk, range(1, total + 1), chunks))
+        finally:
+            cancel_event = getattr(self, "cancel_event", None)
+            ex.shutdown(wait=cancel_event is None or not cancel_event.is_set(),
+                        cancel_futures=True)
 
         reduce_user = build_reduce_prompt(
             current_language=current_language, partials=partials)
         merged = self._llm(client, system, reduce_user)
         return merged
 
-    def _gen_summary(self, client: Any, notes: str) -> str:
-        from .config import TARGET_SUMMARY_WORDS_MIN, TARGET_SUMMARY_WORDS_MAX
-
-        current_language = self._current_language()
-        system = summary_system_prompt(current_language)
-        notes_label = self._llm_notes_label()
+    def _notes_for_transcript(self, client: Any, provider: str, transcript_text: str,
+                              current_language: str) -> str:
+        key = text_sha256(self._llm_model_id(provider), current_language, transcript_text)
+        notes = self._notes_cache.get(key)
+        if notes is not None:
+            self._notes_cache.move_to_end(key)
+            return notes
+
+        # Cache per chiamata solo per le note: testo libero, sempre valido, e
+        # note stabili tra le sessioni mantengono valida la cache delle sezioni.
+        # Le sezioni (con i loro tentativi ripetuti) passano da _cached_section,
+        # che salva solo i risultati validi.
+        if CACHE_ENABLED:
+            client = CachedLLMClient(client, JsonDiskCache("llm"), self._llm_model_id(provider))
+        notes = self._map_reduce_notes(client, transcript_text, current_language)
+        self._notes_cache[key] = notes
+        if len(self._notes_cache) > NOTES_CACHE_SIZE:
+            self._notes_cache.popitem(last=False)
+        return notes
+
+    def _cached_section(self, provider: str, current_language: str, notes: str,
+                        step: PostprocessStep, produce: Callable[[], Any]) -> Any:
+        if not CACHE_ENABLED:
+            return produce()
+        # Sezione già generata sulle stesse note: nessuna chiamata LLM,
+        # compresi i tentativi ripetuti del riassunto
+        params = (
+            f"{TARGET_SUMMARY_WORDS_MIN}-{TARGET_SUMMARY_WORDS_MAX}"
+            if step["kind"] == "summary" else str(step["target"])
+        )
+        key = text_sha256(self._llm_model_id(provider), current_language,
+                          step["section"], params, notes)
+        cache = JsonDiskCache("sections")
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+        result = produce()
+        if result:
+            cache.put(key, result)
+        return result
+
+    def _gen_summary(self, client: Any, notes: str, current_language: str,
+                     stream_section: str | None = None) -> str:
+        # Stesso system prompt delle altre sezioni: prefisso comune in cache
+        system = academic_system_prompt(current_language)
+        notes_label_value = notes_label(current_language)
         attempt = 0
         best = ""
+        retry_note = ""
         while attempt < 3:
             user = build_summary_prompt(
                 current_language=current_language,
                 notes=notes,
-                notes_label_value=notes_label,
+                notes_label_value=notes_label_value,
                 target_min=TARGET_SUMMARY_WORDS_MIN,
                 target_max=TARGET_SUMMARY_WORDS_MAX,
+                retry_note=retry_note,
             )
-            md = self._llm(client, system, user)
+            md = self._llm(client, system, user, stream_section,
+                           max_tokens=LLM_MAX_TOKENS_SUMMARY)
             best = md or best
-            m = re.search(r"<!--\s*WORDS:\s*(\d+)\s*-->",
-                          md or "", re.IGNORECASE)
-            wc = int(m.group(1)) if m else count_words(md)
-            if wc >= TARGET_SUMMARY_WORDS_MIN:
+            if summary_word_count(md) >= TARGET_SUMMARY_WORDS_MIN:
                 return md
             attempt += 1
-            notes = notes + summary_retry_note(current_language)
+            retry_note += summary_retry_note(current_language)
         return best
 
-    def _gen_list_with_count(self, client: Any, notes: str, kind: str, n: int) -> list[dict[str, str]]:
-        notes_label = self._llm_notes_label()
-        current_language = self._current_language()
-        system = list_system_prompt(current_language)
+    def _gen_list_with_count(self, client: Any, notes: str, current_language: str,
+                             kind: str, n: int,
+                             stream_section: str | None = None) -> list[dict[str, str]]:
+        notes_label_value = notes_label(current_language)
+        system = academic_system_prompt(current_language)
         schema_examples = list_schema_examples(current_language)
 
         def key_for(item: dict[str, str]) -> tuple[str, ...]:
@@ -220,20 +373,28 @@ class ProcessingMixin:
         seen: set[tuple[str, ...]] = set()
         guard = 0
         while len(collected) < n and guard < 4:
-            remaining = n - len(collected)
+            # Primo giro con qualche elemento in più: i duplicati scartati non
+            # costano un secondo giro sulle note complete
+            remaining = n - len(collected) + (LIST_EXTRA_ITEMS if guard == 0 else 0)
             user = build_list_prompt(
                 current_language=current_language,
                 notes=notes,
-                notes_label_value=notes_label,
+                notes_label_value=notes_label_value,
                 kind=kind,
                 remaining=remaining,
                 schema_example=schema_examples[kind],
+                # Nei giri successivi il modello vede cosa ha già prodotto:
+                # meno duplicati scartati, meno chiamate per arrivare a n
+                already_used=[key_for(item)[0] for item in collected],
             )
-            out = self._llm(client, system, user)
+            # Solo il primo giro viene mostrato in streaming: i completamenti
+            # successivi non cancellano l'anteprima già visibile
+            out = self._llm(client, system, user,
+                            stream_section if guard == 0 else None)
 
             arr: list[dict[str, str]] | None = None
             try:
-                parsed = json.loads(out)
+                parsed = json_codec.loads(out)
                 arr = to_str_dict_list(parsed)
             except Exception:
                 extracted = extract_json_candidate(out)
@@ -295,17 +456,149 @@ class ProcessingMixin:
             "oppure imposta la variabile FFMPEG_BINARY con il percorso completo dell'eseguibile."
         )
 
-    def _configure_audio_binaries(self) -> None:
+    def _configure_audio_binaries(self) -> Any:
+        audio_segment = audio_segment_class()
         ffmpeg_binary = self._resolve_ffmpeg_binary()
-        setattr(AudioSegment, "converter", ffmpeg_binary)
-        setattr(AudioSegment, "ffmpeg", ffmpeg_binary)
+        setattr(audio_segment, "converter", ffmpeg_binary)
+        setattr(audio_segment, "ffmpeg", ffmpeg_binary)
         ffprobe_binary = shutil.which("ffprobe") or shutil.which("avprobe")
         if ffprobe_binary:
-            setattr(AudioSegment, "ffprobe", ffprobe_binary)
+            setattr(audio_segment, "ffprobe", ffprobe_binary)
+        return audio_segment
 
     def _load_audio_segment(self, path: str) -> Any:
-        self._configure_audio_binaries()
-        from_file = getattr(AudioSegment, "from_file", None)
+        audio_segment = self._configure_audio_binaries()
+        from_file = getattr(audio_segment, "from_file", None)
         if not callable(from_file):
             raise RuntimeError("pydub AudioSegment.from_file non disponibile.")
         return from_file(path)
+
+    def _plan_audio_chunks(self, audio: Any, chunk_ms: int) -> list[tuple[int, int]]:
+        total_ms = len(audio)
+        try:
+            from .audio_core import (
+                pcm_samples,
+                quietest_cut_ms,
+                silence_ranges_from_energies,
+                window_energies,
+            )
+
+            samples = pcm_samples(
+                audio.raw_data,
+                sample_width=audio.sample_width,
+                channels=audio.channels,
+            )
+            energy, win = window_energies(samples, frame_rate=audio.frame_rate)
+            silence_ranges = silence_ranges_from_energies(
+                energy,
+                win=win,
+                frame_rate=audio.frame_rate,
+                min_silence_ms=SILENCE_MIN_LEN_MS,
+                thresh_db=audio.dBFS - SILENCE_THRESH_OFFSET_DB,
+                full_scale=audio.max_possible_amplitude,
+            )
+        except Exception:
+            return plan_chunk_ranges(total_ms, chunk_ms, [])
+
+        def fallback_cut(start: int, limit: int) -> int:
+            return quietest_cut_ms(
+                energy,
+                win=win,
+                frame_rate=audio.frame_rate,
+                # Solo nella seconda metà del chunk: mai chunk più corti di chunk_ms/2
+                lo_ms=max(start + chunk_ms // 2, limit - CHUNK_CUT_SEARCH_MS),
+                hi_ms=limit,
+            )
+
+        return plan_chunk_ranges(total_ms, chunk_ms, silence_ranges, fallback_cut)
+
+    def _is_silent_chunk(self, audio: Any, start_ms: int, end_ms: int) -> bool:
+        try:
+            from .audio_core import chunk_rms, pcm_samples
+
+            samples = pcm_samples(
+                audio.raw_data,
+                sample_width=audio.sample_width,
+                channels=audio.channels,
+            )
+            rms = chunk_rms(samples, frame_rate=audio.frame_rate,
+                            start_ms=start_ms, end_ms=end_ms)
+        except Exception:
+            return False
+        return rms < SILENT_CHUNK_RMS
+
+    def _load_transcription_audio(self, path: str) -> Any:
+        # Riusa la decodifica precedente se il file non è cambiato
+        # (es. nuova trascrizione con altra lingua o modello).
+        mtime = os.path.getmtime(path)
+        cached = self._cached_audio
+        if cached is not None and cached[0] == path and cached[1] == mtime:
+            return cached[2]
+
+        # Una sola conversione a mono/16 kHz/16 bit: slicing, silenzi ed export
+        # lavorano poi sempre sui dati già ridotti.
+        audio = self._load_audio_segment(path)
+        audio = audio.set_channels(1).set_frame_rate(AUDIO_SAMPLE_RATE).set_sample_width(2)
+        self._cached_audio = (path, mtime, audio)
+        return audio
+
+    def _probe_audio_duration_ms(self, path: str) -> int:
+        ffprobe_binary = shutil.which("ffprobe")
+        if ffprobe_binary:
+            try:
+                result = subprocess.run(
+                    [ffprobe_binary, "-v", "error", "-print_format", "json",
+                     "-show_format", path],
+                    check=True,
+                    capture_output=True,
+                )
+                return int(float(json_codec.loads(result.stdout)["format"]["duration"]) * 1000)
+            except (OSError, subprocess.CalledProcessError, KeyError, TypeError, ValueError):
+                LOGGER.debug("ffprobe non ha restituito la durata di %s",
+                             path, exc_info=True)
+        # Fallback: decodifica completa (es. bundle senza ffprobe)
+        return len(self._load_audio_segment(path))
+
+    def _stream_copy_audio_chunk(self, source_path: str, start_ms: int, end_ms: int) -> bytes:
+        ext = os.path.splitext(source_path)[1].lower()
+        result = subprocess.run(
+            [
+                self._resolve_ffmpeg_binary(),
+                "-v", "error",
+                "-ss", f"{start_ms / 1000:.3f}",
+                "-i", source_path,
+                "-t", f"{(end_ms - start_ms) / 1000:.3f}",
+                "-map", "0:a:0",
+                "-c", "copy",
+                "-avoid_negative_ts", "make_zero",
+                *STREAM_COPY_MUXERS[ext],
+                "pipe:1",
+            ],
+            check=True,
+            capture_output=True,
+        )
+        if not result.stdout:
+            raise RuntimeError("ffmpeg non ha prodotto dati audio.")
+        return result.stdout
+
+    def _export_audio_chunk(self, audio: Any, source_path: str, start_ms: int, end_ms: int, stream_copy: bool) -> AudioBytes:
+        ext = os.path.splitext(source_path)[1].lower()
+        if stream_copy and ext in STREAM_COPY_MUXERS:
+            try:
+                data = self._stream_copy_audio_chunk(
+                    source_path, start_ms, end_ms)
+                return (f"chunk{ext}", data)
+            except (OSError, RuntimeError, subprocess.CalledProcessError):
+                LOGGER.warning(
+                    "Taglio ffmpeg senza ricodifica fallito, uso export WAV", exc_info=True)
+
+        from .audio_core import wav_chunk_bytes
+
+        return ("chunk.wav", wav_chunk_bytes(
+            audio.raw_data,
+            start_ms=start_ms,
+            end_ms=end_ms,
+            frame_rate=audio.frame_rate,
+            channels=audio.channels,
+            sample_width=audio.sample_width,
+        ))
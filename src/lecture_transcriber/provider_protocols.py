@@ -1,16 +1,21 @@
-from typing import Any, Protocol
+from typing import Any, Callable, Iterable, Protocol
 
 
 class AudioSegmentLike(Protocol):
+    raw_data: bytes
+    frame_rate: int
+    channels: int
+    sample_width: int
+    dBFS: float
+    max_possible_amplitude: float
+
     def set_channels(self, channels: int) -> "AudioSegmentLike": ...
 
     def set_frame_rate(self, frame_rate: int) -> "AudioSegmentLike": ...
 
-    def __len__(self) -> int: ...
-
-    def __getitem__(self, key: slice) -> "AudioSegmentLike": ...
+    def set_sample_width(self, sample_width: int) -> "AudioSegmentLike": ...
 
-    def export(self, out_f: str, format: str) -> Any: ...
+    def __len__(self) -> int: ...
 
 
 class AudioSegmentFactory(Protocol):
@@ -30,10 +35,14 @@ class AudioAPI(Protocol):
     transcriptions: TranscriptionsAPI
 
 
+# Audio in memoria: (nome file con estensione, contenuto)
+AudioBytes = tuple[str, bytes]
+
+
 class TranscriptionClientLike(Protocol):
     def transcribe(
         self,
-        audio: str | None = None,
+        audio: str | AudioBytes | None = None,
         *,
         wav_path: str | None = None,
         model: str | None = None,
@@ -54,6 +63,21 @@ class CompletionResponseLike(Protocol):
     choices: list[ChoiceLike]
 
 
+class DeltaLike(Protocol):
+    content: str | None
+
+
+class ChunkChoiceLike(Protocol):
+    delta: DeltaLike
+
+
+class CompletionChunkLike(Protocol):
+    choices: list[ChunkChoiceLike]
+
+
+CompletionStreamLike = Iterable[CompletionChunkLike]
+
+
 class CompletionsAPI(Protocol):
     def create(self, **kwargs: Any) -> CompletionResponseLike: ...
 
@@ -83,10 +107,23 @@ class OllamaChatResponseLike(Protocol):
     message: OllamaMessageLike
 
 
+OllamaChatStreamLike = Iterable[OllamaChatResponseLike]
+
+
 class OllamaClientFactory(Protocol):
     def __call__(self, *, host: str | None = None, **
                  kwargs: Any) -> OllamaClientLike: ...
 
 
+TokenCallback = Callable[[str], None]
+
+
 class LLMClientLike(Protocol):
-    def complete(self, *, system: str, user: str) -> str: ...
+    def complete(
+        self,
+        *,
+        system: str,
+        user: str,
+        on_token: TokenCallback | None = None,
+        max_tokens: int | None = None,
+    ) -> str: ...
@@ -1,13 +1,15 @@
 from typing import cast
 
-from pydub import AudioSegment as _AudioSegment  # type: ignore[import-untyped]
-
-from .faster_whisper_provider import create_faster_whisper_transcription_client
-from .groq_provider import GrokProvider
-from .ollama_provider import OllamaProvider
 from .provider_protocols import AudioSegmentFactory, LLMClientLike, TranscriptionClientLike
 
-AudioSegment = cast(AudioSegmentFactory, _AudioSegment)
+# groq, ollama, faster-whisper e pydub vengono importati al primo utilizzo:
+# non servono per mostrare la finestra e rallentano l'avvio.
+
+
+def audio_segment_class() -> AudioSegmentFactory:
+    from pydub import AudioSegment  # type: ignore[import-untyped]
+
+    return cast(AudioSegmentFactory, AudioSegment)
 
 
 def _normalize_choice(value: str, valid: set[str], default: str) -> str:
@@ -35,8 +37,12 @@ def create_transcription_client_for_provider(
     if normalized_provider == "groq":
         if not api_key:
             raise RuntimeError("GROQ_API_KEY non impostata.")
+        from .groq_provider import GrokProvider
+
         return GrokProvider().create_transcription_client(api_key=api_key)
     if normalized_provider == "faster-whisper":
+        from .faster_whisper_provider import create_faster_whisper_transcription_client
+
         return create_faster_whisper_transcription_client(
             model_name=model_name,
             device=device,
@@ -59,6 +65,8 @@ def create_llm_client_for_provider(
     if normalized_provider == "groq":
         if not api_key:
             raise RuntimeError("GROQ_API_KEY non impostata.")
+        from .groq_provider import GrokProvider
+
         return GrokProvider().create_llm_client(
             api_key=api_key,
             model=model,
@@ -66,6 +74,8 @@ def create_llm_client_for_provider(
             max_tokens=max_tokens,
         )
     if normalized_provider == "ollama":
+        from .ollama_provider import OllamaProvider
+
         return OllamaProvider(host=host).create_llm_client(
             model=model,
             temperature=temperature,
@@ -1,4 +1,7 @@
-TRANSLATIONS: dict[str, dict[str, str]] = {
+from types import MappingProxyType
+from typing import Mapping
+
+_TRANSLATIONS: dict[str, dict[str, str]] = {
     "it": {
         "window_title": "Lezione → Trascrizione, Riassunti, Domande & Flashcard",
         "label_audio_file": "File audio:",
@@ -21,9 +24,12 @@ TRANSLATIONS: dict[str, dict[str, str]] = {
         "status_no_running_transcription": "Nessuna trascrizione in corso.",
         "status_transcription_completed": "Trascrizione completata.",
         "status_chunk_completed": "Chunk {current}/{total} completato",
+        "chunk_silence": "[silenzio]",
         "status_canceled_by_user": "Annullato dall'utente.",
         "status_llm_generating": "LLM: generazione contenuti in corso…",
         "status_llm_notes": "LLM: sintetizzo note/outline…",
+        "status_llm_notes_chunk": "LLM: note parziali {current}/{total}",
+        "status_llm_sections_completed": "LLM: sezioni completate {current}/{total}",
         "status_llm_abstract": "LLM: genero abstract…",
         "status_llm_summary": "LLM: genero riassunto lungo…",
         "status_llm_outline": "LLM: costruisco outline…",
@@ -102,9 +108,12 @@ TRANSLATIONS: dict[str, dict[str, str]] = {
         "status_no_running_transcription": "No transcription is currently running.",
         "status_transcription_completed": "Transcription completed.",
         "status_chunk_completed": "Chunk {current}/{total} completed",
+        "chunk_silence": "[silence]",
         "status_canceled_by_user": "Canceled by user.",
         "status_llm_generating": "LLM: generating content…",
         "status_llm_notes": "LLM: synthesizing notes/outline…",
+        "status_llm_notes_chunk": "LLM: partial notes {current}/{total}",
+        "status_llm_sections_completed": "LLM: sections completed {current}/{total}",
         "status_llm_abstract": "LLM: generating abstract…",
         "status_llm_summary": "LLM: generating long summary…",
         "status_llm_outline": "LLM: building outline…",
@@ -162,3 +171,8 @@ TRANSLATIONS: dict[str, dict[str, str]] = {
         "difficulty_label": "Difficulty",
     },
 }
+
+# Tabelle in sola lettura: nessun modulo può alterare le traduzioni a runtime
+TRANSLATIONS: Mapping[str, Mapping[str, str]] = MappingProxyType({
+    lang: MappingProxyType(strings) for lang, strings in _TRANSLATIONS.items()
+})
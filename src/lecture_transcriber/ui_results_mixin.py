@@ -1,10 +1,10 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from typing import Any, cast
+from typing import Any, Callable, cast
 
 from .fp_core import (
-    build_flashcards_csv_rows,
     parse_flashcards_from_text,
+    render_flashcards_csv,
     render_flashcards_text,
     render_glossary_text,
     render_key_points_text,
@@ -16,6 +16,7 @@ from .fp_core import (
 
 class UIResultsMixin:
     sections: dict[str, tk.Text]
+    _last_flashcards: Any = None
 
     def _t(self, key: str, **kwargs: Any) -> str:
         try:
@@ -24,28 +25,32 @@ class UIResultsMixin:
             return key
 
     def _open_results(self, outs: dict[str, Any]):
-        def set_tab(name: str, value: Any):
-            widget = self.sections.get(name)
-            if widget is not None:
-                widget.delete("1.0", tk.END)
-                widget.insert("1.0", str(value or ""))
-
-        set_tab("abstract", outs.get("abstract", ""))
-        set_tab("summary_markdown", outs.get("summary_markdown", ""))
-        set_tab("outline", render_outline_text(outs.get("outline", [])))
-        set_tab("key_points", render_key_points_text(
-            outs.get("key_points", [])))
-        set_tab(
-            "questions",
-            render_questions_text(
-                outs.get("questions", []),
+        renderers: dict[str, Callable[[Any], str]] = {
+            "abstract": lambda v: str(v or ""),
+            "summary_markdown": lambda v: str(v or ""),
+            "outline": render_outline_text,
+            "key_points": render_key_points_text,
+            "questions": lambda v: render_questions_text(
+                v,
                 answer_label=self._t("answer_label"),
                 difficulty_label=self._t("difficulty_label"),
             ),
-        )
-        set_tab("flashcards", render_flashcards_text(
-            outs.get("flashcards", [])))
-        set_tab("glossary", render_glossary_text(outs.get("glossary", [])))
+            "flashcards": render_flashcards_text,
+            "glossary": render_glossary_text,
+        }
+        # Solo le sezioni presenti: le altre possono essere ancora in streaming
+        for name, value in outs.items():
+            render = renderers.get(name)
+            widget = self.sections.get(name)
+            if render is None or widget is None:
+                continue
+            widget.delete("1.0", tk.END)
+            widget.insert("1.0", render(value))
+            if name == "flashcards":
+                # Dati strutturati per l'export CSV, validi finché la scheda
+                # non viene modificata a mano
+                self._last_flashcards = value
+                widget.edit_modified(False)
 
     def _export_flashcards_csv(self):
         flashcard_widget = self.sections.get("flashcards")
@@ -53,8 +58,10 @@ class UIResultsMixin:
             messagebox.showinfo(self._t("dialog_title_no_cards"), self._t(
                 "dialog_msg_flashcard_tab_missing"))
             return
-        text = flashcard_widget.get("1.0", tk.END)
-        cards = parse_flashcards_from_text(text)
+        if self._last_flashcards is not None and not flashcard_widget.edit_modified():
+            cards = self._last_flashcards
+        else:
+            cards = parse_flashcards_from_text(flashcard_widget.get("1.0", tk.END))
         if not cards:
             messagebox.showinfo(self._t("dialog_title_no_cards"), self._t(
                 "dialog_msg_no_cards_export"))
@@ -65,10 +72,9 @@ class UIResultsMixin:
         if not path:
             return
         try:
-            import csv
-            with open(path, "w", encoding="utf-8", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerows(build_flashcards_csv_rows(cards))
+            # BOM UTF-8: Excel su Windows riconosce correttamente gli accenti
+            with open(path, "w", encoding="utf-8-sig", newline="") as f:
+                f.write(render_flashcards_csv(cards))
             messagebox.showinfo(self._t("dialog_title_exported"), self._t(
                 "dialog_msg_saved_flashcards", path=path))
         except Exception as e: